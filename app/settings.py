@@ -254,4 +254,57 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ------------------------------------------------------------------------------
 # WKHTMLTOPDF
 # ------------------------------------------------------------------------------
-PATH_WKHTMLTOPDF = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
\ No newline at end of file
+PATH_WKHTMLTOPDF = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
+
+# ------------------------------------------------------------------------------
+# Invoice PDF Rendering
+# ------------------------------------------------------------------------------
+INVOICE_RENDER_WORKERS = int(os.getenv("INVOICE_RENDER_WORKERS", 2))              # concurrent wkhtmltopdf processes
+INVOICE_RENDER_MAX_PENDING = int(os.getenv("INVOICE_RENDER_MAX_PENDING", 20))     # queued + running renders
+INVOICE_RENDER_JOB_TTL = 60 * 60                                                  # seconds a finished job is kept
+INVOICE_PDF_CACHE_DIR = MEDIA_ROOT / "invoice_cache"
+INVOICE_PDF_CACHE_MAX_BYTES = int(os.getenv("INVOICE_PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+INVOICE_EXPORT_WORKERS = int(os.getenv("INVOICE_EXPORT_WORKERS", 4))              # processes per bulk ZIP export
+
+# ------------------------------------------------------------------------------
+# Medicine Search
+# ------------------------------------------------------------------------------
+MEDICINE_SEARCH_MAX_RESULTS = 1000          # ranked hits kept per query
+MEDICINE_SEARCH_REBUILD_INTERVAL = int(os.getenv("MEDICINE_SEARCH_REBUILD_INTERVAL", 0))  # seconds; picks up other server processes' writes, 0 = off
+MEDICINE_AUTOCOMPLETE_REBUILD_INTERVAL = int(os.getenv("MEDICINE_AUTOCOMPLETE_REBUILD_INTERVAL", 0))  # seconds; 0 = rebuild only when the catalog version moves
+MEDICINE_AUTOCOMPLETE_VERSION_CHECK_INTERVAL = 1   # seconds between catalog version reads on lookup (other server processes' writes)
+
+# ------------------------------------------------------------------------------
+# Expiry Sweeper
+# ------------------------------------------------------------------------------
+EXPIRY_SWEEP_INTERVAL = int(os.getenv("EXPIRY_SWEEP_INTERVAL", 0))   # seconds; 0 = run only via manage.py sweep_expired
+EXPIRY_SWEEP_CHUNK_SIZE = 1000                                       # rows flipped per transaction
+
+# ------------------------------------------------------------------------------
+# Stock Ledger
+# ------------------------------------------------------------------------------
+STOCK_SNAPSHOT_INTERVAL = int(os.getenv("STOCK_SNAPSHOT_INTERVAL", 0))   # seconds; 0 = run only via manage.py snapshot_stock
+STOCK_SNAPSHOT_LAG = 5 * 60                                              # seconds; snapshots stop this far behind now
+
+# ------------------------------------------------------------------------------
+# Dashboard
+# ------------------------------------------------------------------------------
+DASHBOARD_STATS_CACHE_TTL = 30              # seconds; writes invalidate earlier through the catalog versions
+DASHBOARD_PUSH_DEBOUNCE = 0.5               # seconds; writes within this window are pushed as one event
+DASHBOARD_STREAM_KEEPALIVE = 25             # seconds between keepalive comments on an idle stream
+DASHBOARD_STREAM_QUEUE_SIZE = 100           # undelivered events per client before it is resynced
+
+# ------------------------------------------------------------------------------
+# Reorder Suggestions
+# ------------------------------------------------------------------------------
+REORDER_VELOCITY_DAYS = 30                  # sales history behind the daily velocity
+REORDER_LEAD_TIME_DAYS = 7                  # days from order to stock on the shelf
+REORDER_COVER_DAYS = 30                     # days of sales an order should cover after it arrives
+REORDER_VELOCITY_CACHE_TTL = 5 * 60         # seconds the per-medicine sales totals are reused
+
+# ------------------------------------------------------------------------------
+# Expiry Risk Forecast
+# ------------------------------------------------------------------------------
+EXPIRY_RISK_INTERVAL = int(os.getenv("EXPIRY_RISK_INTERVAL", 0))     # seconds; 0 = run only via manage.py forecast_expiry_risk
+EXPIRY_RISK_HORIZON_DAYS = 180                                       # batches expiring later are not forecast
+EXPIRY_RISK_VELOCITY_DAYS = 90                                       # sales history behind the daily velocity
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class AppsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps'
+
+    def ready(self):
+        from apps.helpers.expiry_helper import start_expiry_sweeper
+        from apps.helpers.stock_ledger_helper import start_stock_snapshots
+        from apps.helpers.expiry_risk_helper import start_expiry_risk_forecasts
+        from apps.helpers.medicine_autocomplete_helper import start_medicine_autocomplete_rebuilds
+        from apps.helpers.medicine_search_helper import start_medicine_search_rebuilds
+        start_expiry_sweeper()
+        start_stock_snapshots()
+        start_expiry_risk_forecasts()
+        start_medicine_autocomplete_rebuilds()
+        start_medicine_search_rebuilds()
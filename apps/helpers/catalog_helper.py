@@ -0,0 +1,59 @@
+from django.db import transaction
+from apps.models import CatalogVersion
+from apps.helpers.medicine_autocomplete_helper import medicine_autocomplete_index
+from apps.helpers.medicine_search_helper import medicine_search_index
+from apps.helpers.stock_alert_helper import sync_stock_alerts
+from apps.helpers.dashboard_stream_helper import dashboard_broadcaster
+
+MEDICINES = "medicines"
+SUPPLIERS = "suppliers"
+
+
+# ------------------------------------------------------------------------------
+# Change Hooks (call inside the writing transaction)
+# ------------------------------------------------------------------------------
+def medicines_changed(medicine_ids):
+    """
+    MedicineInventory rows were written; call after the write.
+    Now: update the low-stock alert set for those rows.
+    After commit: bump the medicines catalog version, re-read the rows
+    into the autocomplete and search indexes and nudge open dashboard
+    streams (bumping after commit keeps the version row out of the sale's
+    locks).
+    """
+    medicine_ids = {int(medicine_id) for medicine_id in medicine_ids}
+    sync_stock_alerts(medicine_ids)
+
+    def committed():
+        version = CatalogVersion.bump(MEDICINES)
+        medicine_autocomplete_index.refresh(medicine_ids, version)
+        medicine_search_index.refresh(medicine_ids)
+        dashboard_broadcaster.changed()
+
+    transaction.on_commit(committed)
+
+
+def suppliers_changed(renamed=False):
+    """A Supplier was written. renamed: company_name changed, so medicines' last_supplier_name did too."""
+    def committed():
+        CatalogVersion.bump(SUPPLIERS)
+        if renamed:
+            CatalogVersion.bump(MEDICINES)
+            medicine_autocomplete_index.invalidate()
+        dashboard_broadcaster.changed()
+
+    transaction.on_commit(committed)
+
+
+# ------------------------------------------------------------------------------
+# Conditional GET
+# ------------------------------------------------------------------------------
+def catalog_etag(catalog):
+    """
+    etag_func for django.views.decorators.http.etag: the catalog version.
+    A matching If-None-Match gets a 304 after one primary key read,
+    without the list query or JSON encoding.
+    """
+    def etag_func(request, *args, **kwargs):
+        return f"{catalog}-{CatalogVersion.current(catalog)}"
+    return etag_func
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from apps.models import (
+    MedicineInventory, Supplier, SalesInvoice,
+    PurchaseInvoice, StockAlert, CatalogVersion
+)
+from apps.helpers.catalog_helper import MEDICINES, SUPPLIERS
+
+
+def compute_dashboard_stats():
+    medicine_counts = MedicineInventory.objects.aggregate(
+        total_medicines=Count("id", filter=Q(is_active=True)),
+        expired_count=Count("id", filter=Q(is_active=True, is_expired=True)),
+    )
+
+    # Per-medicine thresholds, read from the maintained alert set
+    alert_counts = dict(
+        StockAlert.objects.values_list("alert_level").annotate(total=Count("id")).order_by()
+    )
+
+    return {
+        "total_medicines": medicine_counts["total_medicines"],
+        "total_suppliers": Supplier.objects.filter(is_active=True).count(),
+        "total_sales_bills": SalesInvoice.objects.count(),
+        "total_purchase_bills": PurchaseInvoice.objects.count(),
+        "low_stock_count": alert_counts.get("low", 0),
+        "out_of_stock_count": alert_counts.get("out", 0),
+        "expired_count": medicine_counts["expired_count"],
+    }
+
+
+def dashboard_stats():
+    """
+    Dashboard counters, cached for DASHBOARD_STATS_CACHE_TTL seconds.
+
+    The cache key carries the medicines and suppliers catalog versions,
+    which every write path bumps on commit (sales, purchases and expiry
+    returns always move stock, so they bump medicines), so a write
+    invalidates the entry in every server process. A hit costs one
+    indexed read of catalog_versions.
+    """
+    versions = dict(
+        CatalogVersion.objects.filter(catalog__in=[MEDICINES, SUPPLIERS]).values_list("catalog", "version")
+    )
+    cache_key = f"dashboard-stats:{versions.get(MEDICINES, 0)}:{versions.get(SUPPLIERS, 0)}"
+
+    stats = cache.get(cache_key)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(cache_key, stats, settings.DASHBOARD_STATS_CACHE_TTL)
+    return stats
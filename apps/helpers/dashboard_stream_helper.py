@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import contextvars
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class DashboardBroadcaster:
+    """
+    In-process fan-out of dashboard counter changes to open SSE streams
+    (single node: every subscriber lives on this process's event loop).
+
+    Write paths call changed() after commit, from any thread. Changes
+    arriving within DASHBOARD_PUSH_DEBOUNCE seconds are coalesced into one
+    recompute of the stats (a cache hit unless a write bumped a catalog
+    version), and only the counters that moved are pushed. With no open
+    streams, changed() does nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._subscribers = set()
+        self._pending = False
+        self._last_stats = None
+
+    # -------------------------
+    # Subscribers (event loop)
+    # -------------------------
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=settings.DASHBOARD_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+            if not self._subscribers:
+                self._last_stats = None
+
+    def baseline(self, stats):
+        """Stats a new subscriber was sent; deltas are computed against them until the next push."""
+        with self._lock:
+            if self._last_stats is None:
+                self._last_stats = stats
+
+    # -------------------------
+    # Publishing
+    # -------------------------
+    def changed(self):
+        """Counters may have moved. Safe to call from any thread."""
+        with self._lock:
+            if not self._subscribers or self._pending:
+                return
+            self._pending = True
+            loop = self._loop
+        try:
+            # Fresh context: the caller's would tie the task to its request's sync thread
+            loop.call_soon_threadsafe(lambda: loop.create_task(self._publish()), context=contextvars.Context())
+        except RuntimeError:
+            # Event loop gone (server shutting down)
+            with self._lock:
+                self._pending = False
+
+    @staticmethod
+    def _current_stats():
+        # Imported here: dashboard_helper -> catalog_helper -> this module
+        from apps.helpers.dashboard_helper import dashboard_stats
+        try:
+            return dashboard_stats()
+        finally:
+            close_old_connections()
+
+    async def _publish(self):
+        await asyncio.sleep(settings.DASHBOARD_PUSH_DEBOUNCE)
+        with self._lock:
+            self._pending = False
+
+        try:
+            stats = await sync_to_async(self._current_stats)()
+        except Exception:
+            logger.exception("Dashboard stats for the live stream failed")
+            return
+
+        with self._lock:
+            last, self._last_stats = self._last_stats, stats
+            subscribers = list(self._subscribers)
+
+        last = last or {}
+        moved = {key: value for key, value in stats.items() if last.get(key) != value}
+        if not moved:
+            return
+
+        event = {"values": moved, "deltas": {key: value - last.get(key, 0) for key, value in moved.items()}}
+        for queue in subscribers:
+            if queue.full():
+                # A stalled client: replace its backlog with the full current stats
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"values": stats, "deltas": {}})
+            else:
+                queue.put_nowait(event)
+
+
+dashboard_broadcaster = DashboardBroadcaster()
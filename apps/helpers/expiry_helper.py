@@ -0,0 +1,68 @@
+import datetime
+from django.conf import settings
+from django.db import transaction
+from apps.models import MedicineInventory, JobCheckpoint
+from apps.helpers.catalog_helper import medicines_changed
+from apps.helpers.periodic_helper import start_periodic_task
+
+import logging
+logger = logging.getLogger(__name__)
+
+EXPIRY_SWEEP_JOB = "expiry_sweeper"
+
+
+# ------------------------------------------------------------------------------
+# Sweep
+# ------------------------------------------------------------------------------
+def sweep_expired(today=None, full=False, chunk_size=None):
+    """
+    Flip is_expired on every batch whose expiry_date passed since the
+    previous run. A batch is expired once expiry_date < today, the same
+    rule sellable_batches_q uses.
+
+    The high-water mark (job_checkpoints) is the "today" of the last
+    run, so each run reads only the expiry_date range [mark, today)
+    through idx_med_inv_active_expiry. full=True ignores the mark.
+
+    Returns {"expired": rows changed, "from_date": mark, "to_date": today}.
+    """
+    today = today or datetime.date.today()
+    chunk_size = chunk_size or settings.EXPIRY_SWEEP_CHUNK_SIZE
+
+    mark = None if full else JobCheckpoint.get_value(EXPIRY_SWEEP_JOB)
+    from_date = datetime.date.fromisoformat(mark) if mark else None
+
+    # is_active IN (0, 1) keeps both values on the (is_active, expiry_date) index
+    candidates = MedicineInventory.objects.filter(
+        is_active__in=[True, False],
+        expiry_date__lt=today,
+        is_expired=False,
+    )
+    if from_date:
+        candidates = candidates.filter(expiry_date__gte=from_date)
+
+    expired = 0
+    while True:
+        with transaction.atomic():
+            ids = list(candidates.order_by("expiry_date", "id").values_list("id", flat=True)[:chunk_size])
+            if not ids:
+                break
+            expired += MedicineInventory.objects.filter(id__in=ids).update(is_expired=True)
+            medicines_changed(ids)
+
+    JobCheckpoint.set_value(EXPIRY_SWEEP_JOB, today.isoformat())
+
+    return {"expired": expired, "from_date": from_date, "to_date": today}
+
+
+# ------------------------------------------------------------------------------
+# In-Process Periodic Task (EXPIRY_SWEEP_INTERVAL > 0)
+# ------------------------------------------------------------------------------
+def _periodic_sweep():
+    result = sweep_expired()
+    if result["expired"]:
+        logger.info("Expiry sweep: %d medicines marked expired", result["expired"])
+
+
+def start_expiry_sweeper():
+    start_periodic_task("expiry-sweeper", settings.EXPIRY_SWEEP_INTERVAL, _periodic_sweep)
@@ -0,0 +1,156 @@
+import datetime
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.models import MedicineInventory, ExpiryRiskForecast
+from apps.helpers.periodic_helper import start_periodic_task
+from apps.helpers.reorder_helper import NO_SUPPLIER, medicine_groups, load_units_sold_by_name, medicine_details
+
+import logging
+logger = logging.getLogger(__name__)
+
+FORECAST_CHUNK_SIZE = 2000
+
+
+def _load_batches(today):
+    """Active, unexpired batches with stock, expiring within the horizon, as column arrays sorted by id."""
+    queryset = MedicineInventory.objects.filter(
+        is_active=True,
+        is_expired=False,
+        current_stock__gt=0,
+        expiry_date__isnull=False,
+        expiry_date__lte=today + datetime.timedelta(days=settings.EXPIRY_RISK_HORIZON_DAYS),
+    ).annotate(
+        supplier=Coalesce("last_supplier_id", Value(NO_SUPPLIER))
+    ).order_by("id").values_list("id", "current_stock", "supplier", "expiry_date", "purchase_price", "name")
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    ids, stock, supplier, expiry, price, names = zip(*rows) if rows else ((),) * 6
+    group, keys = medicine_groups(names)
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "stock": np.array(stock, dtype=np.int64),
+        "supplier": np.array(supplier, dtype=np.int64),
+        "expiry": np.array(expiry, dtype="datetime64[D]"),
+        "price": np.array(price, dtype=np.float64),
+        "group": group,
+        "keys": keys,
+    }
+
+
+def _grouped_running_min(values, group):
+    """np.minimum.accumulate restarting at every group; rows must be sorted by group."""
+    if not len(values):
+        return values
+    # Shift each later group below everything before it, so the running minimum restarts there
+    step = int(values.max() - values.min()) + 1
+    offset = group * step
+    return np.minimum.accumulate(values - offset) + offset
+
+
+def forecast_expiry_risk(today=None):
+    """
+    Replace the expiry_risk_forecast snapshot. Returns (forecast_at, rows at risk).
+
+    Sales are FEFO across the batches of a medicine (all batches sharing
+    medicine_name_key), so velocity is per medicine and the batches of a
+    medicine are worked through in expiry order. In one vectorized pass:
+        daily velocity  = units of the medicine sold over the last EXPIRY_RISK_VELOCITY_DAYS / that many days
+        demand(k)       = floor(velocity * days until batch k expires)
+        sold through k  = min(sold through k-1 + stock(k), demand(k))
+        projected sold  = sold through k - sold through k-1
+        at risk         = stock(k) - projected sold
+
+    "sold through k" unrolls to a grouped cumulative sum of stock plus a
+    grouped running minimum, so stock an earlier batch is left with when
+    it expires does not count against the demand of later batches.
+    """
+    today = today or datetime.date.today()
+    velocity_days = settings.EXPIRY_RISK_VELOCITY_DAYS
+
+    batches = _load_batches(today)
+    sold = load_units_sold_by_name(batches["keys"], today - datetime.timedelta(days=velocity_days - 1))
+
+    # -------------------------
+    # Vectorized pass (FEFO order within each medicine)
+    # -------------------------
+    order = np.lexsort((batches["id"], batches["expiry"], batches["group"]))
+    group = batches["group"][order]
+    stock = batches["stock"][order]
+
+    days_to_expiry = np.maximum((batches["expiry"][order] - np.datetime64(today, "D")).astype(np.int64), 0)
+    velocity = (sold / velocity_days)[group]
+    demand = np.floor(velocity * days_to_expiry).astype(np.int64)
+
+    # Group codes are dense and sorted here: the first row of each row's medicine
+    start = np.searchsorted(group, group)
+    is_first = start == np.arange(len(group))
+
+    # C(k): stock of the medicine's batches up to and including k
+    cumulative_stock = np.cumsum(stock)
+    cumulative_stock -= cumulative_stock[start] - stock[start]
+
+    # sold through k = C(k) + min(0, min over j <= k of demand(j) - C(j))
+    sold_through = cumulative_stock + np.minimum(_grouped_running_min(demand - cumulative_stock, group), 0)
+    sold_before = np.where(is_first, 0, np.roll(sold_through, 1))
+    projected_sold = sold_through - sold_before
+
+    at_risk = stock - projected_sold
+    value_at_risk = at_risk * batches["price"][order]
+
+    # Soonest expiry first, then the most money at stake
+    picked = np.flatnonzero(at_risk > 0)
+    picked = picked[np.lexsort((-value_at_risk[picked], days_to_expiry[picked]))]
+
+    ids = batches["id"][order]
+    supplier = batches["supplier"][order]
+    expiry = batches["expiry"][order]
+    details = medicine_details(ids[picked].tolist(), fields=("name", "batch_number", "last_supplier_name"))
+    forecast_at = timezone.now()
+    forecasts = []
+    for index in picked.tolist():
+        medicine_id = int(ids[index])
+        medicine = details.get(medicine_id, {})
+        supplier_id = int(supplier[index])
+        forecasts.append(ExpiryRiskForecast(
+            forecast_at=forecast_at,
+            medicine_id=medicine_id,
+            name=medicine.get("name", ""),
+            batch_number=medicine.get("batch_number", ""),
+            expiry_date=expiry[index].item(),
+            days_to_expiry=int(days_to_expiry[index]),
+            current_stock=int(stock[index]),
+            daily_velocity=round(float(velocity[index]), 2),
+            projected_sold=int(projected_sold[index]),
+            quantity_at_risk=int(at_risk[index]),
+            value_at_risk=round(float(value_at_risk[index]), 2),
+            supplier_id=None if supplier_id == NO_SUPPLIER else supplier_id,
+            supplier_name=medicine.get("last_supplier_name"),
+        ))
+
+    # Readers see the old snapshot until the new one is complete
+    with transaction.atomic():
+        ExpiryRiskForecast.objects.bulk_create(forecasts, batch_size=FORECAST_CHUNK_SIZE)
+        ExpiryRiskForecast.objects.exclude(forecast_at=forecast_at).delete()
+
+    return forecast_at, len(forecasts)
+
+
+def latest_forecast_at():
+    return ExpiryRiskForecast.objects.aggregate(latest=Max("forecast_at"))["latest"]
+
+
+def _periodic_forecast():
+    forecast_at, rows = forecast_expiry_risk()
+    logger.info("Expiry risk forecast as of %s: %d batches at risk", forecast_at, rows)
+
+
+def start_expiry_risk_forecasts():
+    start_periodic_task("expiry-risk-forecast", settings.EXPIRY_RISK_INTERVAL, _periodic_forecast)
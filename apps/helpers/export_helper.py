@@ -0,0 +1,175 @@
+import io
+import csv
+import json
+import datetime
+from django.db.models import OuterRef, Subquery
+from django.core.serializers.json import DjangoJSONEncoder
+from apps.models import (
+    MedicineInventory, Supplier,
+    SalesInvoice, SalesInvoiceItem,
+    PurchaseInvoice, PurchaseInvoiceItem,
+)
+
+EXPORT_CHUNK_SIZE = 2000
+
+CSV, NDJSON = "csv", "ndjson"
+CONTENT_TYPES = {
+    CSV: "text/csv; charset=utf-8",
+    NDJSON: "application/x-ndjson",
+}
+
+
+def _related(model, field, key="id"):
+    """Correlated lookup of model.field by primary key, for tables joined without a ForeignKey."""
+    return Subquery(model.objects.filter(id=OuterRef(key)).values(field)[:1])
+
+
+# ------------------------------------------------------------------------------
+# Datasets: (queryset, exported columns) for a date range
+# ------------------------------------------------------------------------------
+def _sales_in_range(from_date, to_date):
+    invoices = SalesInvoice.objects.all()
+    if from_date:
+        invoices = invoices.filter(invoice_date__gte=from_date)
+    if to_date:
+        invoices = invoices.filter(invoice_date__lt=to_date + datetime.timedelta(days=1))
+    return invoices
+
+
+def _purchases_in_range(from_date, to_date):
+    invoices = PurchaseInvoice.objects.all()
+    if from_date:
+        invoices = invoices.filter(invoice_date__gte=from_date)
+    if to_date:
+        invoices = invoices.filter(invoice_date__lte=to_date)
+    return invoices
+
+
+def _medicines(from_date, to_date):
+    """Range applies to created_at (medicines added in the range)."""
+    medicines = MedicineInventory.objects.all()
+    if from_date:
+        medicines = medicines.filter(created_at__gte=from_date)
+    if to_date:
+        medicines = medicines.filter(created_at__lt=to_date + datetime.timedelta(days=1))
+    return medicines, [
+        "id", "name", "batch_number", "hsn_code", "unit", "packing_details",
+        "manufacturing_date", "expiry_date", "rack_location", "purchase_price", "mrp",
+        "current_stock", "low_stock_alert", "is_active", "is_expired",
+        "last_supplier_id", "last_supplier_name", "created_at", "updated_at",
+    ]
+
+
+def _sales(from_date, to_date):
+    return _sales_in_range(from_date, to_date), [
+        "id", "invoice_id", "invoice_date", "payment_mode", "customer_name", "doctor_name",
+        "total_medicines", "total_price", "total_discount_price", "final_selling_price",
+    ]
+
+
+def _sales_items(from_date, to_date):
+    """Range applies to the invoice date."""
+    items = SalesInvoiceItem.objects.filter(
+        sales_invoice_id__in=_sales_in_range(from_date, to_date).values("id")
+    ).annotate(
+        invoice_id=_related(SalesInvoice, "invoice_id", "sales_invoice_id"),
+        invoice_date=_related(SalesInvoice, "invoice_date", "sales_invoice_id"),
+        medicine_name=_related(MedicineInventory, "name", "medicine_id"),
+        batch_number=_related(MedicineInventory, "batch_number", "medicine_id"),
+    )
+    return items, [
+        "id", "sales_invoice_id", "invoice_id", "invoice_date", "medicine_id", "medicine_name",
+        "batch_number", "quantity", "mrp", "discount", "discount_price", "selling_price",
+    ]
+
+
+def _purchases(from_date, to_date):
+    invoices = _purchases_in_range(from_date, to_date).annotate(
+        supplier_name=_related(Supplier, "company_name", "supplier_id"),
+    )
+    return invoices, [
+        "id", "invoice_number", "invoice_date", "supplier_id", "supplier_name",
+        "payment_mode", "total_amount", "amount_paid", "remarks",
+    ]
+
+
+def _purchase_items(from_date, to_date):
+    """Range applies to the invoice date."""
+    items = PurchaseInvoiceItem.objects.filter(
+        purchase_invoice_id__in=_purchases_in_range(from_date, to_date).values("id")
+    ).annotate(
+        invoice_number=_related(PurchaseInvoice, "invoice_number", "purchase_invoice_id"),
+        invoice_date=_related(PurchaseInvoice, "invoice_date", "purchase_invoice_id"),
+        medicine_name=_related(MedicineInventory, "name", "medicine_id"),
+        batch_number=_related(MedicineInventory, "batch_number", "medicine_id"),
+    )
+    return items, [
+        "id", "purchase_invoice_id", "invoice_number", "invoice_date", "medicine_id",
+        "medicine_name", "batch_number", "quantity", "purchase_price", "mrp",
+    ]
+
+
+DATASETS = {
+    "medicines": _medicines,
+    "sales": _sales,
+    "sales_items": _sales_items,
+    "purchases": _purchases,
+    "purchase_items": _purchase_items,
+}
+
+
+# ------------------------------------------------------------------------------
+# Streaming
+# ------------------------------------------------------------------------------
+def _row_batches(queryset, columns, chunk_size):
+    """
+    Rows in id order, chunk_size per query: WHERE id > <last id> LIMIT n.
+    MySQLdb buffers a whole result set client side (iterator() does not
+    stream there), so keyset batches are what keeps memory flat.
+    """
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by("id").values_list(*columns)[:chunk_size]
+        )
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _csv_lines(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(columns)
+    yield flush()
+    for rows in batches:
+        writer.writerows(rows)
+        yield flush()
+
+
+def _ndjson_lines(columns, batches):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for rows in batches:
+        yield "".join(encoder.encode(dict(zip(columns, row))) + "\n" for row in rows)
+
+
+def stream_export(dataset, output=CSV, from_date=None, to_date=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one DATASETS table as CSV (header row first) or NDJSON, one
+    chunk per chunk_size rows. Nothing is queried before the first
+    chunk is asked for, and only one batch is held in memory at a time.
+    """
+    queryset, columns = DATASETS[dataset](from_date, to_date)
+    batches = _row_batches(queryset, columns, chunk_size)
+    lines = _csv_lines(columns, batches) if output == CSV else _ndjson_lines(columns, batches)
+    for text in lines:
+        yield text.encode("utf-8")
@@ -0,0 +1,440 @@
+import os
+import re
+import time
+import base64
+import hashlib
+import mimetypes
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from django.conf import settings
+from django.template.loader import render_to_string
+from apps.models import SalesInvoiceItem, StoreProfile, MedicineInventory
+from apps.helpers.wkhtmltopdf_helper import render_html_to_pdf
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+# ------------------------------------------------------------------------------
+# Store Header (process-level cache)
+# ------------------------------------------------------------------------------
+# The logo and signature are embedded as data URIs, so wkhtmltopdf never
+# fetches them over HTTP. The header is rebuilt only when the store row's
+# (id, updated_at) changes, which one small query checks on every call.
+_store_header = None
+
+
+def _file_data_uri(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    mime_type = mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def get_store_header():
+    """
+    Returns {"store", "logo_url", "signature_path"} for the invoice template.
+    """
+    global _store_header
+    version = StoreProfile.objects.values_list("id", "updated_at").first()
+
+    header = _store_header
+    if header and header["version"] == version:
+        return header
+
+    store = StoreProfile.objects.first() if version else None
+    header = {
+        "version": version,
+        "store": store,
+        "logo_url": _file_data_uri(store.logo.path) if store and store.logo else None,
+        # This points to your project_root/media/signature/sign.jpeg
+        "signature_path": _file_data_uri(os.path.join(settings.MEDIA_ROOT, 'signature', 'sign.jpeg')),
+    }
+    _store_header = header
+    return header
+
+
+def reset_store_header():
+    global _store_header
+    _store_header = None
+
+
+def store_profile_changed():
+    """Drops everything derived from the store header (call after a profile write)."""
+    reset_store_header()
+    clear_invoice_pdf_cache()
+
+
+# ------------------------------------------------------------------------------
+# HTML + PDF
+# ------------------------------------------------------------------------------
+def build_invoice_context(invoice, header):
+    """
+    Template context for one invoice: one query for the lines and one
+    in_bulk query for all their medicines, whatever the number of lines.
+    """
+    items = list(SalesInvoiceItem.objects.filter(sales_invoice_id=invoice.id).order_by("id"))
+    medicines = MedicineInventory.objects.only("name", "batch_number").in_bulk(
+        {item.medicine_id for item in items}
+    )
+
+    enriched_items = []
+    for item in items:
+        med = medicines.get(item.medicine_id)
+        enriched_items.append({
+            'name': med.name if med else "Unknown Medicine",
+            'batch_number': med.batch_number if med and med.batch_number else "N/A",
+            'qty': item.quantity,
+            'mrp': item.mrp,
+            'discount': item.discount,
+            'selling_price': item.selling_price
+        })
+
+    return {
+        'invoice': invoice,
+        'items': enriched_items,
+        'store': header["store"],
+        'logo_url': header["logo_url"],
+        'signature_path': header["signature_path"],
+    }
+
+
+def render_invoice_html(invoice, header):
+    """Renders the sales invoice template for one invoice."""
+    return render_to_string('invoices/invoice_template.html', build_invoice_context(invoice, header))
+
+
+def html_to_pdf(html_content):
+    """Runs wkhtmltopdf and returns the PDF bytes."""
+    return render_html_to_pdf(html_content, settings.PATH_WKHTMLTOPDF)
+
+
+# ------------------------------------------------------------------------------
+# Rendered PDF Cache
+# ------------------------------------------------------------------------------
+# Files live in INVOICE_PDF_CACHE_DIR as "<invoice db id>_<fingerprint>.pdf".
+# The fingerprint covers SalesInvoice.updated_at and the StoreProfile fields
+# printed in the header, so any edit produces a new key. Medicine names are
+# printed too but not fingerprinted (a medicine's updated_at moves with
+# every sale), so renaming one removes its invoices' files instead. Stale
+# files are removed eagerly by the invalidate_* helpers and otherwise aged
+# out by the size-bounded, least-recently-used eviction in store_invoice_pdf.
+STORE_HEADER_FIELDS = (
+    "store_name", "owner_name", "address_line", "city", "state", "pincode",
+    "gst_number", "drug_license_number", "invoice_footer_note", "logo",
+)
+
+CACHE_KEY_PATTERN = re.compile(r"(\d+)_[0-9a-f]{16}")
+
+
+def invoice_cache_key(invoice, store):
+    parts = [str(invoice.id), invoice.updated_at.isoformat() if invoice.updated_at else ""]
+    if store:
+        parts += [str(getattr(store, field) or "") for field in STORE_HEADER_FIELDS]
+    fingerprint = hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+    return f"{invoice.id}_{fingerprint}"
+
+
+def _cache_path(cache_key):
+    return os.path.join(settings.INVOICE_PDF_CACHE_DIR, f"{cache_key}.pdf")
+
+
+def cached_invoice_pdf(cache_key):
+    """Returns the cached file path (and marks it recently used), or None."""
+    path = _cache_path(cache_key)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def store_invoice_pdf(cache_key, pdf):
+    """Atomically writes a rendered PDF into the cache and returns its path."""
+    os.makedirs(settings.INVOICE_PDF_CACHE_DIR, exist_ok=True)
+    path = _cache_path(cache_key)
+    partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(partial_path, "wb") as f:
+        f.write(pdf)
+    os.replace(partial_path, path)
+
+    _evict_invoice_pdfs(keep=path)
+    return path
+
+
+def _evict_invoice_pdfs(keep=None):
+    """Removes least recently used files until the cache fits INVOICE_PDF_CACHE_MAX_BYTES."""
+    try:
+        entries = [
+            entry for entry in os.scandir(settings.INVOICE_PDF_CACHE_DIR)
+            if entry.is_file() and entry.name.endswith(".pdf")
+        ]
+    except OSError:
+        return
+
+    stats = sorted(((entry.stat(), entry.path) for entry in entries), key=lambda pair: pair[0].st_mtime)
+    total_size = sum(stat.st_size for stat, _ in stats)
+
+    for stat, path in stats:
+        if total_size <= settings.INVOICE_PDF_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total_size -= stat.st_size
+        except OSError:
+            pass
+
+
+def invalidate_invoice_pdfs(invoice_db_ids):
+    """Drops every cached PDF of the given sales invoices, in one scan of the cache."""
+    invoice_db_ids = {str(invoice_db_id) for invoice_db_id in invoice_db_ids}
+    if not invoice_db_ids:
+        return
+    try:
+        entries = list(os.scandir(settings.INVOICE_PDF_CACHE_DIR))
+    except OSError:
+        return
+
+    for entry in entries:
+        match = CACHE_KEY_PATTERN.fullmatch(entry.name[:-len(".pdf")]) if entry.name.endswith(".pdf") else None
+        if match and match.group(1) in invoice_db_ids:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def invalidate_invoice_pdf(invoice_db_id):
+    """Drops every cached PDF of one sales invoice."""
+    invalidate_invoice_pdfs([invoice_db_id])
+
+
+def invalidate_medicine_invoice_pdfs(medicine_id):
+    """Drops the cached PDFs of every sales invoice with a line of the medicine (its printed name changed)."""
+    invalidate_invoice_pdfs(
+        SalesInvoiceItem.objects.filter(medicine_id=medicine_id).values_list("sales_invoice_id", flat=True).distinct()
+    )
+
+
+def clear_invoice_pdf_cache():
+    """Drops every cached PDF, e.g. after the store header changed."""
+    try:
+        entries = list(os.scandir(settings.INVOICE_PDF_CACHE_DIR))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.name.endswith(".pdf"):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# ------------------------------------------------------------------------------
+# Bounded Render Pool
+# ------------------------------------------------------------------------------
+# wkhtmltopdf runs as a child process, so a small thread pool is enough to
+# bound how many renders run at once. Every render (sync or async) goes
+# through the pool; when more than INVOICE_RENDER_MAX_PENDING are queued or
+# running, new renders are refused instead of tying up more web workers.
+#
+# A job id is the cache key of the PDF it produces, so asking twice for the
+# same invoice shares one render and a finished job is simply a cache entry.
+_render_executor = None
+_render_jobs = {}
+_render_in_flight = 0
+_render_lock = threading.Lock()
+
+
+def _get_render_executor():
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = ThreadPoolExecutor(
+            max_workers=settings.INVOICE_RENDER_WORKERS,
+            thread_name_prefix="invoice-pdf"
+        )
+    return _render_executor
+
+
+def _submit(fn, *args):
+    global _render_in_flight
+    with _render_lock:
+        if _render_in_flight >= settings.INVOICE_RENDER_MAX_PENDING:
+            raise RenderQueueFull("Too many invoices are being rendered. Please retry shortly.")
+        _render_in_flight += 1
+        executor = _get_render_executor()
+
+    def release(_future):
+        global _render_in_flight
+        with _render_lock:
+            _render_in_flight -= 1
+
+    future = executor.submit(fn, *args)
+    future.add_done_callback(release)
+    return future
+
+
+def render_pdf(html_content):
+    """Render in the pool and wait for the result (bounded synchronous mode)."""
+    return _submit(html_to_pdf, html_content).result()
+
+
+def _prune_jobs():
+    """Forget finished jobs older than INVOICE_RENDER_JOB_TTL."""
+    expired_before = time.time() - settings.INVOICE_RENDER_JOB_TTL
+    for job_id, job in list(_render_jobs.items()):
+        if job["status"] in ("done", "failed") and job["created_at"] < expired_before:
+            _render_jobs.pop(job_id, None)
+
+
+def _run_render_job(job_id, html_content):
+    job = _render_jobs[job_id]
+    job["status"] = "running"
+    try:
+        job["path"] = store_invoice_pdf(job_id, html_to_pdf(html_content))
+        job["status"] = "done"
+    except Exception as e:
+        logger.exception("Invoice PDF Rendering Failed")
+        job["error"] = str(e)
+        job["status"] = "failed"
+
+
+def submit_render_job(cache_key, html_content, filename):
+    """
+    Queue an asynchronous render and return its job id (the cache key).
+    A render already pending for the same key is reused.
+    Raises RenderQueueFull when the pool is saturated.
+    """
+    with _render_lock:
+        _prune_jobs()
+        job = _render_jobs.get(cache_key)
+        if job and job["status"] in ("pending", "running"):
+            return cache_key
+
+        _render_jobs[cache_key] = {
+            "status": "pending",
+            "filename": filename,
+            "path": None,
+            "error": None,
+            "created_at": time.time(),
+        }
+
+    try:
+        _submit(_run_render_job, cache_key, html_content)
+    except RenderQueueFull:
+        _render_jobs.pop(cache_key, None)
+        raise
+
+    return cache_key
+
+
+def get_render_job(job_id):
+    """
+    Returns a copy of the job dict, or None if unknown.
+    Falls back to the PDF cache, so a job finished by another
+    server process (or an already cached invoice) is still served.
+    """
+    match = CACHE_KEY_PATTERN.fullmatch(job_id or "")
+    if not match:
+        return None
+
+    job = _render_jobs.get(job_id)
+    if job and job["status"] != "done":
+        return dict(job)
+
+    path = cached_invoice_pdf(job_id)
+    if path:
+        filename = job["filename"] if job else f"Invoice_{match.group(1)}.pdf"
+        return {"status": "done", "filename": filename, "path": path, "error": None}
+
+    return None
+
+
+# ------------------------------------------------------------------------------
+# Bulk ZIP Export
+# ------------------------------------------------------------------------------
+class _ZipStream:
+    """Write-only file object that collects zipfile output between yields."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_invoice_zip(invoices, header):
+    """
+    Yields a ZIP archive of invoice PDFs chunk by chunk.
+
+    Cached PDFs are copied as they are; the rest are rendered by a
+    process pool of INVOICE_EXPORT_WORKERS and added as they finish.
+    At most two renders per worker are in flight, so memory stays
+    bounded whatever the number of invoices.
+    """
+    stream = _ZipStream()
+    max_in_flight = settings.INVOICE_EXPORT_WORKERS * 2
+    pending = {}
+
+    with ProcessPoolExecutor(max_workers=settings.INVOICE_EXPORT_WORKERS) as pool, \
+            zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+
+        def write_finished(futures):
+            for future in futures:
+                filename = pending.pop(future)
+                try:
+                    archive.writestr(filename, future.result())
+                except Exception as e:
+                    logger.exception("Invoice PDF Export Failed")
+                    archive.writestr(f"{filename}.error.txt", str(e))
+
+        for invoice in invoices:
+            filename = f"Invoice_{invoice.invoice_id}.pdf"
+            cached_path = cached_invoice_pdf(invoice_cache_key(invoice, header["store"]))
+
+            if cached_path:
+                archive.write(cached_path, filename)
+            else:
+                html_content = render_invoice_html(invoice, header)
+                pending[pool.submit(render_html_to_pdf, html_content, settings.PATH_WKHTMLTOPDF)] = filename
+
+                if len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    write_finished(done)
+
+            data = stream.drain()
+            if data:
+                yield data
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            write_finished(done)
+            yield stream.drain()
+
+    # Central directory, written when the archive closes
+    yield stream.drain()
@@ -0,0 +1,78 @@
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from apps.models import MedicineInventory, SalesInvoice, SalesInvoiceItem
+from apps.helpers.sales_helper import to_money
+
+# ?group_by= value: sales_invoice_items column the rows are grouped on
+MARGIN_GROUPS = {
+    "invoice": "sales_invoice_id",
+    "day": "sales_date",
+    "medicine": "medicine_id",
+}
+
+# "units", not "quantity": an annotation may not shadow the column it sums
+MARGIN_TOTALS = {
+    "lines": Count("id"),
+    "units": Sum("quantity"),
+    "revenue": Sum("selling_price"),
+    "cost": Sum(ExpressionWrapper(
+        F("unit_cost") * F("quantity"), output_field=DecimalField(max_digits=14, decimal_places=2)
+    )),
+}
+
+
+def _margin_row(row):
+    """Amounts as strings, like every other money field of the API."""
+    revenue, cost = to_money(row["revenue"] or 0), to_money(row["cost"] or 0)
+    margin = revenue - cost
+    row.update({
+        "units": row["units"] or 0,
+        "revenue": str(revenue),
+        "cost": str(cost),
+        "margin": str(margin),
+        "margin_percent": str(to_money(margin * 100 / revenue)) if revenue else None,
+    })
+    return row
+
+
+def gross_margin_queryset(from_date, to_date, group_by):
+    """
+    One row per invoice, day or medicine of from_date..to_date (inclusive),
+    grouped straight from sales_invoice_items: revenue is the lines'
+    selling_price, cost their unit_cost snapshot * quantity. Every column
+    read is in idx_sii_date_margin, so no table or join is touched.
+    """
+    key = MARGIN_GROUPS[group_by]
+    return SalesInvoiceItem.objects.filter(
+        sales_date__gte=from_date, sales_date__lte=to_date
+    ).values(key).annotate(**MARGIN_TOTALS).order_by(key)
+
+
+def gross_margin_totals(from_date, to_date):
+    return _margin_row(SalesInvoiceItem.objects.filter(
+        sales_date__gte=from_date, sales_date__lte=to_date
+    ).aggregate(**MARGIN_TOTALS))
+
+
+def gross_margin_rows(rows, group_by):
+    """Margin figures for one page of gross_margin_queryset(), plus the invoice number or medicine name."""
+    rows = [_margin_row(dict(row)) for row in rows]
+
+    if group_by == "invoice":
+        numbers = dict(SalesInvoice.objects.filter(
+            id__in=[row["sales_invoice_id"] for row in rows]
+        ).values_list("id", "invoice_id"))
+        for row in rows:
+            row["invoice_id"] = numbers.get(row["sales_invoice_id"], "")
+
+    elif group_by == "medicine":
+        details = {
+            medicine["id"]: medicine for medicine in
+            MedicineInventory.objects.filter(
+                id__in=[row["medicine_id"] for row in rows]
+            ).values("id", "name", "batch_number")
+        }
+        for row in rows:
+            row["name"] = details.get(row["medicine_id"], {}).get("name", "")
+            row["batch_number"] = details.get(row["medicine_id"], {}).get("batch_number", "")
+
+    return rows
@@ -0,0 +1,227 @@
+import time
+import bisect
+import threading
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from apps.models import MedicineInventory, CatalogVersion
+from apps.helpers.periodic_helper import start_periodic_task
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Fields returned for every suggestion (what the POS picker renders)
+SUGGESTION_FIELDS = ("id", "name", "batch_number", "mrp", "rack_location", "current_stock", "expiry_date")
+
+
+def _active_medicines():
+    return MedicineInventory.objects.filter(is_active=True).annotate(
+        supplier_name=F("last_supplier_name")
+    ).values(*SUGGESTION_FIELDS, "supplier_name")
+
+
+def _catalog_version():
+    # catalog_helper imports this module
+    from apps.helpers.catalog_helper import MEDICINES
+    return CatalogVersion.current(MEDICINES)
+
+
+def _keys(row):
+    """Lowercased strings a row can be found by: full name, each later word of the name, batch."""
+    name = (row["name"] or "").strip().lower()
+    keys = {name} if name else set()
+    words = name.split()
+    for position in range(1, len(words)):
+        keys.add(" ".join(words[position:]))
+    batch = (row["batch_number"] or "").strip().lower()
+    if batch:
+        keys.add(batch)
+    return keys
+
+
+class MedicineAutocompleteIndex:
+    """
+    Sorted array of (key, name, medicine_id) over active medicines.
+
+    A prefix lookup is one bisect plus a scan of at most a few entries
+    past the first k distinct hits, so it stays in microseconds however
+    large the catalog grows. The array is built on first use; after that
+    rows are re-read after a commit through refresh().
+
+    Other server processes' writes show up as a medicines catalog version
+    the index has not seen: lookups read it at most once per
+    MEDICINE_AUTOCOMPLETE_VERSION_CHECK_INTERVAL and, when it moved,
+    start a rebuild on a background thread, never on the request path.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._generation = 0
+        self._refreshed_while_building = None
+        self._version = None
+        self._version_checked_at = 0
+        self._rebuilding = False
+        self.entries = []
+        self.rows = {}
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    @staticmethod
+    def _build():
+        started = time.perf_counter()
+        rows = {row["id"]: row for row in _active_medicines().iterator(chunk_size=5000)}
+        entries = sorted(
+            (key, row["name"], medicine_id)
+            for medicine_id, row in rows.items()
+            for key in _keys(row)
+        )
+        logger.info("Medicine autocomplete index rebuilt: %d rows in %.2fs",
+                    len(rows), time.perf_counter() - started)
+        return rows, entries
+
+    def rebuild(self):
+        """
+        Re-read the whole catalog into a built index. The scan runs outside
+        the lock, so lookups keep answering from the current array; rows
+        refreshed meanwhile are re-read after the swap.
+        """
+        with self._lock:
+            if self._built_at is None:
+                # Never queried (or invalidated): the next lookup builds it
+                return
+            generation = self._generation
+            self._refreshed_while_building = set()
+
+        # Read before the scan: writes committed during it show up as a newer version
+        version = _catalog_version()
+        rows, entries = self._build()
+
+        with self._lock:
+            refreshed, self._refreshed_while_building = self._refreshed_while_building, None
+            if generation != self._generation:
+                # invalidate() ran during the scan: the rows read may predate it
+                return
+            self.rows, self.entries = rows, entries
+            self._built_at = time.monotonic()
+            # refresh() may have moved it past version for rows re-read just above
+            self._version = max(version, self._version or 0)
+            if refreshed:
+                self._refresh_rows(refreshed)
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Medicine autocomplete rebuild failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+            connection.close()
+
+    def _check_version(self):
+        """Start a background rebuild if the catalog version moved past what the index has seen."""
+        now = time.monotonic()
+        with self._lock:
+            if (self._built_at is None or self._rebuilding or
+                    now - self._version_checked_at < settings.MEDICINE_AUTOCOMPLETE_VERSION_CHECK_INTERVAL):
+                return
+            self._version_checked_at = now
+            seen = self._version
+
+        if _catalog_version() == seen:
+            return
+
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(
+            target=self._rebuild_in_background, name="medicine-autocomplete-rebuild", daemon=True
+        ).start()
+
+    def refresh(self, medicine_ids, version=None):
+        """
+        Re-read the given rows (stock, price, name or active flag changed)
+        if the index is built. version: the catalog version the write was
+        bumped to; when it is the next one after the index's, no other
+        process wrote in between and no rebuild is needed.
+        """
+        medicine_ids = {int(medicine_id) for medicine_id in medicine_ids}
+        with self._lock:
+            if self._refreshed_while_building is not None:
+                self._refreshed_while_building.update(medicine_ids)
+            if self._built_at is None:
+                return
+            self._refresh_rows(medicine_ids)
+            if version is not None and self._version is not None and version == self._version + 1:
+                self._version = version
+
+    def _refresh_rows(self, medicine_ids):
+        fresh = {row["id"]: row for row in _active_medicines().filter(id__in=medicine_ids)}
+
+        for medicine_id in medicine_ids:
+            old = self.rows.pop(medicine_id, None)
+            if old:
+                for key in _keys(old):
+                    index = bisect.bisect_left(self.entries, (key, old["name"], medicine_id))
+                    if index < len(self.entries) and self.entries[index] == (key, old["name"], medicine_id):
+                        self.entries.pop(index)
+
+            row = fresh.get(medicine_id)
+            if row:
+                self.rows[medicine_id] = row
+                for key in _keys(row):
+                    bisect.insort(self.entries, (key, row["name"], medicine_id))
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._built_at = None
+            self.entries = []
+            self.rows = {}
+
+    def _ensure_built(self):
+        if self._built_at is None:
+            self._version = _catalog_version()
+            self.rows, self.entries = self._build()
+            self._built_at = time.monotonic()
+            self._version_checked_at = time.monotonic()
+
+    # -------------------------
+    # Query
+    # -------------------------
+    def suggest(self, prefix, limit):
+        """Up to limit rows whose name, a word of the name, or batch starts with prefix."""
+        prefix = str(prefix or "").strip().lower()
+        if not prefix:
+            return []
+
+        self._check_version()
+        with self._lock:
+            self._ensure_built()
+
+            entries = self.entries
+            index = bisect.bisect_left(entries, (prefix,))
+            seen = set()
+            suggestions = []
+            while index < len(entries) and len(suggestions) < limit:
+                key, _, medicine_id = entries[index]
+                if not key.startswith(prefix):
+                    break
+                if medicine_id not in seen:
+                    seen.add(medicine_id)
+                    suggestions.append(self.rows[medicine_id])
+                index += 1
+
+        return suggestions
+
+
+medicine_autocomplete_index = MedicineAutocompleteIndex()
+
+
+def start_medicine_autocomplete_rebuilds():
+    start_periodic_task(
+        "medicine-autocomplete-rebuild", settings.MEDICINE_AUTOCOMPLETE_REBUILD_INTERVAL, medicine_autocomplete_index.rebuild
+    )
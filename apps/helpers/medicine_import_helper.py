@@ -0,0 +1,200 @@
+import csv
+import datetime
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from apps.models import MedicineInventory
+from apps.helpers.catalog_helper import medicines_changed
+from apps.helpers.stock_ledger_helper import record_stock_movements
+
+IMPORT_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_COLUMNS = ("name", "batch_number", "mrp")
+
+UNIT_VALUES = {value for value, _ in MedicineInventory.UNIT_CHOICES}
+
+
+def _text(max_length):
+    def parse(value):
+        if len(value) > max_length:
+            raise ValueError(f"longer than {max_length} characters")
+        return value
+    return parse
+
+
+def _integer(value):
+    return int(value)
+
+
+def _money(value):
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError("not a number")
+    if amount < 0:
+        raise ValueError("must not be negative")
+    return amount.quantize(Decimal("0.01"))
+
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError("expected YYYY-MM-DD")
+
+
+def _unit(value):
+    value = value.lower()
+    if value not in UNIT_VALUES:
+        raise ValueError(f"must be one of {', '.join(sorted(UNIT_VALUES))}")
+    return value
+
+
+def _boolean(value):
+    return value.strip().lower() in ("1", "true", "yes", "y")
+
+
+# CSV column -> parser; anything else in the header is ignored
+COLUMN_PARSERS = {
+    "name": _text(255),
+    "batch_number": _text(128),
+    "medicine_uses": str,
+    "hsn_code": _text(20),
+    "unit": _unit,
+    "packing_details": _text(128),
+    "low_stock_alert": _integer,
+    "manufacturing_date": _date,
+    "expiry_date": _date,
+    "rack_location": _text(64),
+    "purchase_price": _money,
+    "mrp": _money,
+    "current_stock": _integer,
+    "is_active": _boolean,
+}
+
+
+def parse_row(row):
+    """(field values, errors) for one CSV row dict."""
+    values, errors = {}, []
+    for column, parser in COLUMN_PARSERS.items():
+        raw = (row.get(column) or "").strip()
+        if not raw:
+            if column in REQUIRED_COLUMNS:
+                errors.append(f"{column} is required")
+            continue
+        try:
+            values[column] = parser(raw)
+        except ValueError as e:
+            errors.append(f"{column}: {e}")
+    return values, errors
+
+
+# ------------------------------------------------------------------------------
+# Import
+# ------------------------------------------------------------------------------
+def _import_chunk(rows, update_fields, today):
+    """Upsert one chunk of parsed rows in one transaction. Returns (created, updated)."""
+    keys = {(values["name"].casefold(), values["batch_number"].casefold()) for values in rows}
+
+    with transaction.atomic():
+        existing = {
+            (name.casefold(), batch_number.casefold()): (medicine_id, current_stock)
+            for medicine_id, name, batch_number, current_stock in
+            MedicineInventory.objects.select_for_update().filter(
+                name__in={values["name"] for values in rows}
+            ).values_list("id", "name", "batch_number", "current_stock")
+            if (name.casefold(), batch_number.casefold()) in keys
+        }
+
+        medicines = []
+        for values in rows:
+            expiry_date = values.get("expiry_date")
+            medicines.append(MedicineInventory(
+                **values,
+                is_expired=bool(expiry_date and expiry_date < today),
+            ))
+
+        # MySQL cannot name the conflict target: ON DUPLICATE KEY UPDATE hits uq_med_inv_name_batch
+        upsert = {"update_conflicts": True, "update_fields": update_fields}
+        if connection.features.supports_update_conflicts_with_target:
+            upsert["unique_fields"] = ["name", "batch_number"]
+        MedicineInventory.objects.bulk_create(medicines, **upsert)
+
+        # bulk_create does not return ids for upserted rows on MySQL: read them back
+        imported = {
+            (name.casefold(), batch_number.casefold()): (medicine_id, current_stock)
+            for medicine_id, name, batch_number, current_stock in
+            MedicineInventory.objects.filter(
+                name__in={values["name"] for values in rows}
+            ).values_list("id", "name", "batch_number", "current_stock")
+            if (name.casefold(), batch_number.casefold()) in keys
+        }
+
+        stock_deltas = {}
+        for key, (medicine_id, current_stock) in imported.items():
+            stock_before = existing.get(key, (None, 0))[1]
+            stock_deltas[medicine_id] = current_stock - stock_before
+
+        record_stock_movements(stock_deltas, "import")
+        medicines_changed(stock_deltas)
+
+    return len(keys) - len(existing), len(existing)
+
+
+def import_medicines_csv(text_stream, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Stream a medicine catalog CSV into medicine_inventory.
+
+    The header names the columns (see COLUMN_PARSERS); name, batch_number
+    and mrp are required. Rows are parsed one at a time and upserted on
+    (name, batch_number) in chunks of chunk_size, one transaction per
+    chunk, so memory stays flat whatever the file size. Existing batches
+    get only the columns present in the file updated. Invalid rows are
+    skipped and reported.
+
+    Returns {"total_rows", "created", "updated", "failed", "errors": [{"row", "errors"}]}.
+    """
+    reader = csv.DictReader(text_stream)
+    header = [column.strip() for column in reader.fieldnames or []]
+    reader.fieldnames = header
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    update_fields = [
+        column for column in COLUMN_PARSERS
+        if column in header and column not in ("name", "batch_number")
+    ] + ["updated_at"]
+    if "expiry_date" in header:
+        update_fields.append("is_expired")
+
+    today = datetime.date.today()
+    report = {"total_rows": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+    chunk = {}
+
+    def flush():
+        created, updated = _import_chunk(list(chunk.values()), update_fields, today)
+        report["created"] += created
+        report["updated"] += updated
+        chunk.clear()
+
+    # Row 1 is the header
+    for row_number, row in enumerate(reader, start=2):
+        report["total_rows"] += 1
+        values, errors = parse_row(row)
+        if errors:
+            report["failed"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"row": row_number, "errors": errors})
+            continue
+
+        # A batch repeated within a chunk: the later row wins
+        chunk[(values["name"].casefold(), values["batch_number"].casefold())] = values
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    return report
@@ -0,0 +1,276 @@
+import heapq
+import datetime
+from decimal import Decimal
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from apps.models import MedicineInventory, MedicineDailySales, SalesInvoice, SalesInvoiceItem
+from apps.helpers.sales_helper import to_money
+from apps.helpers.stock_helper import medicine_name_key, medicine_names_q
+
+REBUILD_CHUNK_DAYS = 31
+DETAIL_CHUNK_SIZE = 2000
+
+# ?group_by= of the analytics: "name" adds up every batch of a medicine
+# (see medicine_name_key), "batch" keeps one row per inventory row
+MEDICINE_SALES_GROUPS = ("name", "batch")
+
+
+def medicine_line_totals(lines):
+    """{medicine_id: (quantity, revenue)} for SalesInvoiceItem objects."""
+    totals = defaultdict(lambda: [0, Decimal("0.00")])
+    for line in lines:
+        totals[line.medicine_id][0] += int(line.quantity)
+        totals[line.medicine_id][1] += to_money(line.selling_price)
+    return {medicine_id: tuple(total) for medicine_id, total in totals.items()}
+
+
+# ------------------------------------------------------------------------------
+# Incremental Update (inside the sales transaction)
+# ------------------------------------------------------------------------------
+def record_medicine_sales(sales_date, before=None, after=None):
+    """
+    Move one invoice's lines in medicine_daily_sales: before / after are
+    medicine_line_totals() of its lines before and after the write.
+
+    Existing rows are locked and rewritten with one bulk UPDATE (or
+    deleted once nothing is left on them, so a removed line leaves no
+    zero row behind), missing ones inserted with one INSERT. A sale holds
+    the locks of its medicine rows, so no other sale can create the same
+    (medicine, day) row concurrently.
+    """
+    if isinstance(sales_date, datetime.datetime):
+        sales_date = sales_date.date()
+    before, after = before or {}, after or {}
+
+    deltas = {}
+    for medicine_id in before.keys() | after.keys():
+        old_quantity, old_revenue = before.get(medicine_id, (0, Decimal("0.00")))
+        new_quantity, new_revenue = after.get(medicine_id, (0, Decimal("0.00")))
+        if new_quantity != old_quantity or new_revenue != old_revenue:
+            deltas[medicine_id] = (new_quantity - old_quantity, new_revenue - old_revenue)
+    if not deltas:
+        return
+
+    existing = {
+        row.medicine_id: row for row in
+        MedicineDailySales.objects.select_for_update().filter(sales_date=sales_date, medicine_id__in=deltas)
+    }
+
+    now = timezone.now()
+    updated, emptied, created = [], [], []
+    for medicine_id, (quantity_delta, revenue_delta) in deltas.items():
+        row = existing.get(medicine_id)
+        if row:
+            row.quantity += quantity_delta
+            row.revenue += revenue_delta
+            row.updated_at = now
+            if row.quantity == 0 and row.revenue == 0:
+                emptied.append(row.id)
+            else:
+                updated.append(row)
+        else:
+            created.append(MedicineDailySales(
+                medicine_id=medicine_id,
+                sales_date=sales_date,
+                quantity=quantity_delta,
+                revenue=revenue_delta,
+                updated_at=now,
+            ))
+
+    # Not an upsert: MySQL cannot target uq_med_daily_med_date in bulk_create(update_conflicts=...)
+    if updated:
+        MedicineDailySales.objects.bulk_update(updated, ["quantity", "revenue", "updated_at"])
+    if emptied:
+        MedicineDailySales.objects.filter(id__in=emptied).delete()
+    if created:
+        MedicineDailySales.objects.bulk_create(created)
+
+
+# ------------------------------------------------------------------------------
+# Rebuild
+# ------------------------------------------------------------------------------
+def _aggregate_days(from_date, to_date):
+    # Lines carry their invoice's date (sales_date): no join back to sales_invoices
+    return SalesInvoiceItem.objects.filter(
+        sales_date__gte=from_date, sales_date__lte=to_date
+    ).values("medicine_id", "sales_date").annotate(
+        total_quantity=Sum("quantity"), total_revenue=Sum("selling_price")
+    ).order_by()
+
+
+def rebuild_medicine_daily_sales(from_date=None, to_date=None):
+    """
+    Recompute medicine_daily_sales from the invoice tables, for the
+    from_date..to_date days (default: first to last invoice), one
+    transaction per REBUILD_CHUNK_DAYS days. Returns the number of rows.
+    """
+    if from_date is None or to_date is None:
+        first, last = (
+            SalesInvoice.objects.order_by("invoice_date").values_list("invoice_date", flat=True).first(),
+            SalesInvoice.objects.order_by("-invoice_date").values_list("invoice_date", flat=True).first(),
+        )
+        if first is None:
+            MedicineDailySales.objects.all().delete()
+            return 0
+        if from_date is None and to_date is None:
+            # Days left over from invoices that no longer exist
+            MedicineDailySales.objects.exclude(sales_date__range=(first.date(), last.date())).delete()
+        from_date = from_date or first.date()
+        to_date = to_date or last.date()
+
+    total = 0
+    chunk_start = from_date
+    while chunk_start <= to_date:
+        chunk_end = min(chunk_start + datetime.timedelta(days=REBUILD_CHUNK_DAYS - 1), to_date)
+        with transaction.atomic():
+            MedicineDailySales.objects.filter(sales_date__gte=chunk_start, sales_date__lte=chunk_end).delete()
+            rows = [
+                MedicineDailySales(
+                    medicine_id=row["medicine_id"],
+                    sales_date=row["sales_date"],
+                    quantity=row["total_quantity"],
+                    revenue=row["total_revenue"],
+                )
+                for row in _aggregate_days(chunk_start, chunk_end)
+            ]
+            MedicineDailySales.objects.bulk_create(rows, batch_size=1000)
+        total += len(rows)
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+    return total
+
+
+# ------------------------------------------------------------------------------
+# Analytics
+# ------------------------------------------------------------------------------
+def _medicine_details(medicine_ids):
+    details = {}
+    medicine_ids = list(medicine_ids)
+    for start in range(0, len(medicine_ids), DETAIL_CHUNK_SIZE):
+        for medicine in MedicineInventory.objects.filter(
+            id__in=medicine_ids[start:start + DETAIL_CHUNK_SIZE]
+        ).values("id", "name", "batch_number"):
+            details[medicine["id"]] = medicine
+    return details
+
+
+def _sales_per_batch(from_date, to_date):
+    return MedicineDailySales.objects.filter(
+        sales_date__gte=from_date, sales_date__lte=to_date
+    ).values("medicine_id").annotate(total_quantity=Sum("quantity"), total_revenue=Sum("revenue"))
+
+
+# (row header, totals) pairs, best first
+def _top_batches(from_date, to_date, order, limit):
+    rows = list(_sales_per_batch(from_date, to_date).order_by(f"-{order}", "medicine_id")[:limit])
+    details = _medicine_details([row["medicine_id"] for row in rows])
+    return [
+        ({
+            "medicine_id": row["medicine_id"],
+            "name": details.get(row["medicine_id"], {}).get("name", ""),
+            "batch_number": details.get(row["medicine_id"], {}).get("batch_number", ""),
+        }, row)
+        for row in rows
+    ]
+
+
+def _top_names(from_date, to_date, order, limit):
+    # Every batch sold in the range is read: the best medicine may be spread over several
+    rows = list(_sales_per_batch(from_date, to_date).order_by())
+    details = _medicine_details([row["medicine_id"] for row in rows])
+
+    groups = {}
+    for row in rows:
+        name = details.get(row["medicine_id"], {}).get("name", "")
+        group = groups.setdefault(medicine_name_key(name), {
+            "name": name, "medicine_ids": [], "total_quantity": 0, "total_revenue": Decimal("0.00"),
+        })
+        group["medicine_ids"].append(row["medicine_id"])
+        group["total_quantity"] += row["total_quantity"]
+        group["total_revenue"] += row["total_revenue"]
+
+    for group in groups.values():
+        group["medicine_ids"].sort()
+    top = heapq.nsmallest(limit, groups.values(), key=lambda group: (-group[order], group["medicine_ids"][0]))
+    return [({"name": group["name"], "medicine_ids": group["medicine_ids"]}, group) for group in top]
+
+
+def top_medicines(from_date, to_date, by="quantity", limit=50, group_by="name"):
+    """
+    The limit best selling medicines (all batches added up) or batches of
+    from_date..to_date by units sold or revenue, read from
+    idx_med_daily_date_cover alone.
+    """
+    days = (to_date - from_date).days + 1
+    order = "total_quantity" if by == "quantity" else "total_revenue"
+    top = _top_names if group_by == "name" else _top_batches
+
+    return [
+        {
+            **header,
+            "total_quantity": row["total_quantity"],
+            "total_revenue": to_money(row["total_revenue"]),
+            "avg_daily_quantity": round(row["total_quantity"] / days, 2),
+        }
+        for header, row in top(from_date, to_date, order, limit)
+    ]
+
+
+def _velocity_groups(medicine_ids, group_by):
+    """[(row header, [medicine_id, ...]), ...] in the order of the requested ids."""
+    details = _medicine_details(medicine_ids)
+    if group_by == "batch":
+        return [
+            ({"medicine_id": medicine_id, "name": details.get(medicine_id, {}).get("name", "")}, [medicine_id])
+            for medicine_id in medicine_ids
+        ]
+
+    # Ids of no medicine have no name to group by: they are left out
+    names = {}
+    for medicine_id in medicine_ids:
+        if medicine_id in details:
+            names.setdefault(medicine_name_key(details[medicine_id]["name"]), details[medicine_id]["name"])
+
+    batches = defaultdict(list)
+    for medicine_id, name in MedicineInventory.objects.filter(
+        medicine_names_q(names)
+    ).order_by("id").values_list("id", "name"):
+        if medicine_name_key(name) in names:
+            batches[medicine_name_key(name)].append(medicine_id)
+
+    return [({"name": name, "medicine_ids": batches[key]}, batches[key]) for key, name in names.items()]
+
+
+def medicine_velocity(medicine_ids, from_date, to_date, group_by="name"):
+    """
+    Units sold per day (zero-filled) over from_date..to_date, with the
+    total and the average per day, for each requested medicine (all of
+    its batches added up) or batch.
+    """
+    days = (to_date - from_date).days + 1
+    groups = _velocity_groups(medicine_ids, group_by)
+
+    daily = defaultdict(dict)
+    for medicine_id, sales_date, quantity in MedicineDailySales.objects.filter(
+        medicine_id__in=[medicine_id for _, ids in groups for medicine_id in ids],
+        sales_date__gte=from_date, sales_date__lte=to_date,
+    ).values_list("medicine_id", "sales_date", "quantity"):
+        daily[medicine_id][sales_date] = quantity
+
+    dates = [from_date + datetime.timedelta(days=offset) for offset in range(days)]
+
+    result = []
+    for header, ids in groups:
+        sold = defaultdict(int)
+        for medicine_id in ids:
+            for sales_date, quantity in daily.get(medicine_id, {}).items():
+                sold[sales_date] += quantity
+        total_quantity = sum(sold.values())
+        result.append({
+            **header,
+            "total_quantity": total_quantity,
+            "avg_daily_quantity": round(total_quantity / days, 2),
+            "daily": [{"date": date, "quantity": sold.get(date, 0)} for date in dates],
+        })
+    return result
@@ -0,0 +1,304 @@
+import re
+import time
+import heapq
+import bisect
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, DatabaseError
+from apps.models import MedicineInventory
+from apps.helpers.periodic_helper import start_periodic_task
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Searched columns and their weight in the relevance score
+SEARCH_FIELDS = {
+    "name": 4,
+    "batch_number": 3,
+    "rack_location": 2,
+    "medicine_uses": 1,
+}
+
+# How well a query token matched an indexed token
+EXACT_MATCH, PREFIX_MATCH, INFIX_MATCH = 1.0, 0.75, 0.5
+
+# InnoDB ignores shorter words (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN_SIZE = 3
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text or "").lower())
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def row_token_weights(row):
+    """{token: best field weight} for one medicine_inventory row."""
+    weights = {}
+    for field, weight in SEARCH_FIELDS.items():
+        for token in tokenize(row[field]):
+            weights[token] = max(weights.get(token, 0), weight)
+    return weights
+
+
+# ------------------------------------------------------------------------------
+# In-Process Token / Trigram Index (SQLite, or MySQL without the FULLTEXT key)
+# ------------------------------------------------------------------------------
+class MedicineSearchIndex:
+    """
+    Inverted index over the searched columns of medicine_inventory.
+
+        postings:  token   -> {medicine_id: field weight}
+        vocabulary: sorted tokens, for prefix lookups with bisect
+        grams:     trigram -> {tokens}, for substring (icontains style) lookups
+
+    Built on first search and kept current after every commit through
+    refresh() (see catalog_helper.medicines_changed). Writes made by other
+    server processes are picked up by rebuild() on the periodic task
+    thread (MEDICINE_SEARCH_REBUILD_INTERVAL), never on the request path.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._generation = 0
+        self._refreshed_while_building = None
+        self._reset()
+
+    def _reset(self):
+        self.postings = defaultdict(dict)
+        self.vocabulary = []
+        self.grams = defaultdict(set)
+        self.documents = {}
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def _add_token(self, token):
+        bisect.insort(self.vocabulary, token)
+        for gram in trigrams(token):
+            self.grams[gram].add(token)
+
+    def _drop_token(self, token):
+        del self.postings[token]
+        index = bisect.bisect_left(self.vocabulary, token)
+        if index < len(self.vocabulary) and self.vocabulary[index] == token:
+            self.vocabulary.pop(index)
+        for gram in trigrams(token):
+            self.grams[gram].discard(token)
+            if not self.grams[gram]:
+                del self.grams[gram]
+
+    def _index_row(self, row):
+        medicine_id = row["id"]
+        weights = row_token_weights(row)
+        for token, weight in weights.items():
+            if token not in self.postings:
+                self._add_token(token)
+            self.postings[token][medicine_id] = weight
+        self.documents[medicine_id] = list(weights)
+
+    def _unindex(self, medicine_id):
+        for token in self.documents.pop(medicine_id, ()):
+            self.postings[token].pop(medicine_id, None)
+            if not self.postings[token]:
+                self._drop_token(token)
+
+    @staticmethod
+    def _build():
+        """(postings, vocabulary, grams, documents) for the whole table."""
+        started = time.perf_counter()
+        postings, grams, documents = defaultdict(dict), defaultdict(set), {}
+        for row in MedicineInventory.objects.values("id", *SEARCH_FIELDS).iterator(chunk_size=5000):
+            weights = row_token_weights(row)
+            for token, weight in weights.items():
+                postings[token][row["id"]] = weight
+            documents[row["id"]] = list(weights)
+
+        vocabulary = sorted(postings)
+        for token in vocabulary:
+            for gram in trigrams(token):
+                grams[gram].add(token)
+
+        logger.info("Medicine search index rebuilt: %d rows in %.2fs",
+                    len(documents), time.perf_counter() - started)
+        return postings, vocabulary, grams, documents
+
+    def _swap(self, built):
+        self.postings, self.vocabulary, self.grams, self.documents = built
+        self._built_at = time.monotonic()
+
+    def rebuild(self):
+        """
+        Re-read the whole table into a built index. The scan runs outside
+        the lock, so searches keep answering from the current index; rows
+        refreshed meanwhile are re-indexed after the swap.
+        """
+        with self._lock:
+            if self._built_at is None:
+                # Never searched (or invalidated): the next search builds it
+                return
+            generation = self._generation
+            self._refreshed_while_building = set()
+
+        built = self._build()
+
+        with self._lock:
+            refreshed, self._refreshed_while_building = self._refreshed_while_building, None
+            if generation != self._generation:
+                # invalidate() ran during the scan: the rows read may predate it
+                return
+            self._swap(built)
+            if refreshed:
+                self._refresh_rows(refreshed)
+
+    def refresh(self, medicine_ids):
+        """Re-index the given rows (created, edited or deleted) if the index is built."""
+        medicine_ids = [int(medicine_id) for medicine_id in medicine_ids]
+        with self._lock:
+            if self._refreshed_while_building is not None:
+                self._refreshed_while_building.update(medicine_ids)
+            if self._built_at is None:
+                return
+            self._refresh_rows(medicine_ids)
+
+    def _refresh_rows(self, medicine_ids):
+        rows = {row["id"]: row for row in MedicineInventory.objects.filter(id__in=medicine_ids).values("id", *SEARCH_FIELDS)}
+        for medicine_id in medicine_ids:
+            self._unindex(medicine_id)
+            if medicine_id in rows:
+                self._index_row(rows[medicine_id])
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._built_at = None
+            self._reset()
+
+    def _ensure_built(self):
+        if self._built_at is None:
+            self._swap(self._build())
+
+    # -------------------------
+    # Query
+    # -------------------------
+    def _matching_tokens(self, query_token):
+        """Yields (indexed token, match factor) for one query token."""
+        start = bisect.bisect_left(self.vocabulary, query_token)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(query_token):
+                break
+            yield token, EXACT_MATCH if token == query_token else PREFIX_MATCH
+
+        if len(query_token) < 3:
+            return
+
+        # Substring matches, narrowed down by the query's trigrams
+        candidates = None
+        for gram in trigrams(query_token):
+            tokens = self.grams.get(gram, set())
+            candidates = tokens if candidates is None else candidates & tokens
+            if not candidates:
+                return
+        for token in candidates:
+            if query_token in token and not token.startswith(query_token):
+                yield token, INFIX_MATCH
+
+    def search(self, query, limit):
+        """Ids of rows matching every query token, best score first (newest first on ties)."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        with self._lock:
+            self._ensure_built()
+
+            scores = None
+            for query_token in query_tokens:
+                token_scores = {}
+                for token, factor in self._matching_tokens(query_token):
+                    for medicine_id, weight in self.postings[token].items():
+                        score = weight * factor
+                        if score > token_scores.get(medicine_id, 0):
+                            token_scores[medicine_id] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {
+                        medicine_id: score + token_scores[medicine_id]
+                        for medicine_id, score in scores.items()
+                        if medicine_id in token_scores
+                    }
+                if not scores:
+                    return []
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda pair: (pair[1], pair[0]))
+        return [medicine_id for medicine_id, _ in best]
+
+
+medicine_search_index = MedicineSearchIndex()
+
+
+def start_medicine_search_rebuilds():
+    start_periodic_task("medicine-search-rebuild", settings.MEDICINE_SEARCH_REBUILD_INTERVAL, medicine_search_index.rebuild)
+
+
+# ------------------------------------------------------------------------------
+# MySQL FULLTEXT
+# ------------------------------------------------------------------------------
+_fulltext_available = True
+
+FULLTEXT_SQL = """
+    SELECT id, MATCH(name, batch_number, rack_location, medicine_uses) AGAINST (%s IN BOOLEAN MODE) AS score
+    FROM medicine_inventory
+    WHERE MATCH(name, batch_number, rack_location, medicine_uses) AGAINST (%s IN BOOLEAN MODE)
+    ORDER BY score DESC, id DESC
+    LIMIT %s
+"""
+
+
+def _fulltext_search(query_tokens, limit):
+    # Every word required, each matched as a prefix: "+para* +500*"
+    boolean_query = " ".join(f"+{token}*" for token in query_tokens)
+    with connection.cursor() as cursor:
+        cursor.execute(FULLTEXT_SQL, [boolean_query, boolean_query, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+# ------------------------------------------------------------------------------
+# Entry Point
+# ------------------------------------------------------------------------------
+def search_medicine_ids(query, limit=None):
+    """
+    Relevance-ranked MedicineInventory ids for a free-text query.
+
+    MySQL: FULLTEXT index ft_med_inv_search. Words shorter than InnoDB's
+    minimum token size fall back to an indexed name prefix match.
+    Elsewhere, or when the FULLTEXT key is missing: MedicineSearchIndex.
+    """
+    global _fulltext_available
+    limit = limit or settings.MEDICINE_SEARCH_MAX_RESULTS
+    query_tokens = tokenize(query)
+    if not query_tokens:
+        return []
+
+    if connection.vendor == "mysql" and _fulltext_available:
+        long_tokens = [token for token in query_tokens if len(token) >= FULLTEXT_MIN_TOKEN_SIZE]
+        if not long_tokens:
+            return list(
+                MedicineInventory.objects.filter(name__istartswith=query.strip())
+                .order_by("name", "-id").values_list("id", flat=True)[:limit]
+            )
+        try:
+            return _fulltext_search(long_tokens, limit)
+        except DatabaseError:
+            logger.warning("FULLTEXT index ft_med_inv_search missing, using in-process search index")
+            _fulltext_available = False
+
+    return medicine_search_index.search(query, limit)
@@ -0,0 +1,84 @@
+from django.db import connection
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+
+
+def estimated_count(queryset):
+    """
+    Row count without a full COUNT(*) where possible: InnoDB's table
+    statistics for an unfiltered MySQL table, an exact count otherwise.
+    """
+    if connection.vendor == "mysql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row and row[0] is not None:
+            return int(row[0])
+    return queryset.count()
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination: WHERE id < <last id seen> ORDER BY -id LIMIT n,
+    so page N costs the same as page 1. The total is only computed on
+    request: ?count=exact or ?count=estimate.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-id",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count_mode = request.query_params.get("count")
+        if count_mode == "exact":
+            self.count = queryset.count()
+        elif count_mode == "estimate":
+            self.count = estimated_count(queryset)
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class StandardResultsPagination(PageNumberPagination):
+    """
+    Shared list pagination.
+
+        ?page=N                     page numbers with an exact count (default)
+        ?cursor=                    keyset mode, first page
+        ?cursor=<next/previous>     keyset mode, following pages
+
+    Both modes return {"count", "next", "previous", "results"}.
+    Lists that are not ordered by a stable key (e.g. relevance ranked
+    search hits) stay on page numbers.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def __init__(self, ordering=("-id",)):
+        self.keyset = None
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.cursor_query_param in request.query_params and hasattr(queryset, "query"):
+            self.keyset = KeysetPagination()
+            self.keyset.ordering = self.ordering
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,32 @@
+import time
+import threading
+from django.db import close_old_connections
+
+import logging
+logger = logging.getLogger(__name__)
+
+_started = {}
+
+
+def _run_forever(name, interval, task):
+    while True:
+        time.sleep(interval)
+        try:
+            task()
+        except Exception:
+            logger.exception("Periodic task %s failed", name)
+        finally:
+            close_old_connections()
+
+
+def start_periodic_task(name, interval, task):
+    """
+    Run task() every interval seconds on a daemon thread, once per process.
+    interval <= 0 disables it (run the matching management command from cron instead).
+    """
+    if interval <= 0 or name in _started:
+        return
+
+    thread = threading.Thread(target=_run_forever, args=(name, interval, task), name=name, daemon=True)
+    _started[name] = thread
+    thread.start()
@@ -0,0 +1,49 @@
+from django.db.models import Subquery, OuterRef
+from apps.models import MedicineInventory, PurchaseInvoiceItem, PurchaseInvoice, Supplier
+
+
+# ------------------------------------------------------------------------------
+# Last Supplier (denormalized on medicine_inventory)
+# ------------------------------------------------------------------------------
+def set_last_supplier(medicine_ids, supplier_id):
+    """Stamp supplier_id as the last supplier of the given medicines (one UPDATE)."""
+    medicine_ids = {int(medicine_id) for medicine_id in medicine_ids}
+    if not medicine_ids:
+        return 0
+
+    company_name = Supplier.objects.filter(id=supplier_id).values_list("company_name", flat=True).first()
+    return MedicineInventory.objects.filter(id__in=medicine_ids).update(
+        last_supplier_id=supplier_id,
+        last_supplier_name=company_name,
+    )
+
+
+def recompute_last_supplier(medicine_ids=None):
+    """
+    Derive last_supplier_id / last_supplier_name from the latest purchase
+    invoice item of each medicine. medicine_ids=None updates every row;
+    medicines never purchased are reset to NULL.
+    """
+    queryset = MedicineInventory.objects.all()
+    if medicine_ids is not None:
+        medicine_ids = {int(medicine_id) for medicine_id in medicine_ids}
+        if not medicine_ids:
+            return 0
+        queryset = queryset.filter(id__in=medicine_ids)
+
+    # Two levels deep, so the item lookup must reference the medicine row explicitly
+    latest_pi = PurchaseInvoiceItem.objects.filter(
+        medicine_id=OuterRef(OuterRef("id"))
+    ).order_by("-id").values("purchase_invoice_id")[:1]
+
+    updated = queryset.update(
+        last_supplier_id=Subquery(
+            PurchaseInvoice.objects.filter(id=Subquery(latest_pi)).values("supplier_id")[:1]
+        )
+    )
+    queryset.update(
+        last_supplier_name=Subquery(
+            Supplier.objects.filter(id=OuterRef("last_supplier_id")).values("company_name")[:1]
+        )
+    )
+    return updated
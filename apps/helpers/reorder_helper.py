@@ -0,0 +1,231 @@
+import time
+import datetime
+import threading
+import numpy as np
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+from apps.models import MedicineInventory, MedicineDailySales
+from apps.helpers.stock_helper import medicine_name_key
+
+DETAIL_CHUNK_SIZE = 2000
+
+# Stands in for NULL last_supplier_id in the supplier array
+NO_SUPPLIER = -1
+
+
+_units_sold_cache = {}
+_units_sold_lock = threading.Lock()
+
+
+def fetch_array(values_queryset, width):
+    """
+    Integer columns of a values_list() queryset as one 2-D array. Rows go
+    from the cursor straight into NumPy, skipping the ORM's per-row work.
+    """
+    sql, params = values_queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, width)
+
+
+def medicine_groups(names):
+    """
+    (group per row, group keys) for an iterable of medicine names: batches
+    sharing medicine_name_key() share a group, numbered in key order.
+    """
+    keys = np.array([medicine_name_key(name) for name in names], dtype=str)
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64), keys
+    keys, group = np.unique(keys, return_inverse=True)
+    return group.astype(np.int64), keys
+
+
+def _load_catalog():
+    """Reorderable batches (active, not expired) as column arrays sorted by id, with their medicine group."""
+    queryset = MedicineInventory.objects.filter(is_active=True, is_expired=False).annotate(
+        supplier=Coalesce("last_supplier_id", Value(NO_SUPPLIER))
+    ).order_by("id").values_list("id", "current_stock", "low_stock_alert", "supplier", "name")
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    ids, stock, alert, supplier, names = zip(*rows) if rows else ((),) * 5
+    group, keys = medicine_groups(names)
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "stock": np.array(stock, dtype=np.int64),
+        "alert": np.array(alert, dtype=np.int64),
+        "supplier": np.array(supplier, dtype=np.int64),
+        "group": group,
+        "keys": keys,
+    }
+
+
+def _units_sold_since(since):
+    """
+    {medicine name key: units sold since the given day}, over every batch
+    of the medicine (sold out, expired or inactive ones included). A 30
+    day sum moves slowly, so it is kept for REORDER_VELOCITY_CACHE_TTL
+    seconds; stock is always read fresh.
+    """
+    with _units_sold_lock:
+        cached = _units_sold_cache.get(since)
+        if cached and time.monotonic() - cached[0] < settings.REORDER_VELOCITY_CACHE_TTL:
+            return cached[1]
+
+    rows = fetch_array(
+        MedicineDailySales.objects.filter(sales_date__gte=since).values("medicine_id")
+        .annotate(total=Sum("quantity")).order_by().values_list("medicine_id", "total"),
+        2
+    )
+    names = {}
+    medicine_ids = rows[:, 0].tolist()
+    for start in range(0, len(medicine_ids), DETAIL_CHUNK_SIZE):
+        names.update(MedicineInventory.objects.filter(
+            id__in=medicine_ids[start:start + DETAIL_CHUNK_SIZE]
+        ).values_list("id", "name"))
+
+    by_name = defaultdict(int)
+    for medicine_id, total in rows.tolist():
+        if medicine_id in names:
+            by_name[medicine_name_key(names[medicine_id])] += total
+
+    with _units_sold_lock:
+        _units_sold_cache.clear()
+        _units_sold_cache[since] = (time.monotonic(), dict(by_name))
+    return dict(by_name)
+
+
+def load_units_sold_by_name(keys, since):
+    """Units sold per medicine since the given day, aligned with the group keys of medicine_groups()."""
+    by_name = _units_sold_since(since)
+    return np.array([by_name.get(key, 0) for key in keys.tolist()], dtype=np.int64)
+
+
+def medicine_details(medicine_ids, fields=("name", "batch_number", "mrp", "purchase_price", "last_supplier_name")):
+    """{medicine_id: row dict} for the picked rows only, DETAIL_CHUNK_SIZE ids per query."""
+    details = {}
+    medicine_ids = list(medicine_ids)
+    for start in range(0, len(medicine_ids), DETAIL_CHUNK_SIZE):
+        for row in MedicineInventory.objects.filter(
+            id__in=medicine_ids[start:start + DETAIL_CHUNK_SIZE]
+        ).values("id", *fields):
+            details[row["id"]] = row
+    return details
+
+
+def reorder_suggestions(velocity_days=None, lead_time_days=None, cover_days=None, supplier_id=None):
+    """
+    Draft purchase lists, one per supplier, for every medicine that will
+    run out before a new order could arrive plus cover_days, or that is
+    already below its low_stock_alert.
+
+    A medicine is all batches sharing a name (see medicine_name_key): sales
+    are FEFO across them, so stock and units sold are added up per name
+    first. Then, in one vectorized pass over the medicines:
+        daily velocity  = units sold over the last velocity_days / velocity_days
+        days of cover   = total stock / daily velocity
+        target stock    = max(daily velocity * (lead_time_days + cover_days), highest low_stock_alert)
+        order quantity  = ceil(target stock - total stock)
+
+    The suggestion goes to the newest batch and its last supplier;
+    medicines never bought from a supplier are grouped under supplier_id
+    None. Each group's "draft" can be completed with the supplier's
+    invoice number and date and posted to purchaseInvoices as it is.
+    """
+    velocity_days = velocity_days or settings.REORDER_VELOCITY_DAYS
+    lead_time_days = settings.REORDER_LEAD_TIME_DAYS if lead_time_days is None else lead_time_days
+    cover_days = settings.REORDER_COVER_DAYS if cover_days is None else cover_days
+
+    catalog = _load_catalog()
+    since = datetime.date.today() - datetime.timedelta(days=velocity_days - 1)
+    group, medicines = catalog["group"], len(catalog["keys"])
+
+    # -------------------------
+    # Batches -> medicines
+    # -------------------------
+    stock = np.bincount(group, weights=np.maximum(catalog["stock"], 0), minlength=medicines).astype(np.int64)
+    batches = np.bincount(group, minlength=medicines)
+    alert = np.zeros(medicines, dtype=np.int64)
+    np.maximum.at(alert, group, catalog["alert"])
+    # Rows are in id order: the highest position per group is the newest batch
+    newest = np.full(medicines, -1, dtype=np.int64)
+    np.maximum.at(newest, group, np.arange(len(group)))
+    supplier = catalog["supplier"][newest]
+    sold = load_units_sold_by_name(catalog["keys"], since)
+
+    # -------------------------
+    # Vectorized pass
+    # -------------------------
+    velocity = sold / velocity_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(velocity > 0, stock / velocity, np.inf)
+    target = np.maximum(np.ceil(velocity * (lead_time_days + cover_days)), alert)
+    order_quantity = np.maximum(target - stock, 0).astype(np.int64)
+
+    selected = (order_quantity > 0) & ((days_of_cover < lead_time_days + cover_days) | (stock < alert))
+    if supplier_id is not None:
+        selected &= supplier == int(supplier_id)
+
+    # Most urgent first within each supplier
+    picked = np.flatnonzero(selected)
+    picked = picked[np.lexsort((days_of_cover[picked], supplier[picked]))]
+
+    # -------------------------
+    # Group by supplier
+    # -------------------------
+    details = medicine_details(catalog["id"][newest[picked]].tolist())
+    groups = []
+    boundaries = np.flatnonzero(np.diff(supplier[picked])) + 1
+    for supplier_group in np.split(picked, boundaries) if len(picked) else []:
+        group_supplier = int(supplier[supplier_group[0]])
+        items = []
+        for index in supplier_group.tolist():
+            medicine_id = int(catalog["id"][newest[index]])
+            medicine = details.get(medicine_id, {})
+            items.append({
+                "medicine_id": medicine_id,
+                "name": medicine.get("name", ""),
+                "batch_number": medicine.get("batch_number", ""),
+                "batches": int(batches[index]),
+                "current_stock": int(stock[index]),
+                "low_stock_alert": int(alert[index]),
+                "daily_velocity": round(float(velocity[index]), 2),
+                "days_of_cover": None if np.isinf(days_of_cover[index]) else round(float(days_of_cover[index]), 1),
+                "quantity": int(order_quantity[index]),
+                "mrp": medicine.get("mrp"),
+                "purchase_price": medicine.get("purchase_price"),
+            })
+
+        groups.append({
+            "supplier_id": None if group_supplier == NO_SUPPLIER else group_supplier,
+            "supplier_name": details.get(items[0]["medicine_id"], {}).get("last_supplier_name"),
+            "total_items": len(items),
+            "items": items,
+            "draft": {
+                "supplier_id": None if group_supplier == NO_SUPPLIER else group_supplier,
+                "invoice_number": "",
+                "invoice_date": "",
+                "items": [
+                    {
+                        "medicine_id": item["medicine_id"],
+                        "quantity": item["quantity"],
+                        "purchase_price": item["purchase_price"],
+                        "mrp": item["mrp"],
+                    }
+                    for item in items
+                ],
+            },
+        })
+
+    return {
+        "velocity_days": velocity_days,
+        "lead_time_days": lead_time_days,
+        "cover_days": cover_days,
+        "suppliers": groups,
+    }
@@ -0,0 +1,154 @@
+import datetime
+from decimal import Decimal
+from itertools import zip_longest
+from collections import defaultdict
+from django.utils import timezone
+from apps.models import MedicineInventory, SalesInvoiceItem
+
+TWO_PLACES = Decimal("0.01")
+
+# Fields compared to decide whether an existing line has changed
+SALES_LINE_FIELDS = ("quantity", "mrp", "discount", "discount_price", "selling_price")
+
+
+def to_money(value):
+    return Decimal(str(value)).quantize(TWO_PLACES)
+
+
+# ------------------------------------------------------------------------------
+# Line Pricing (edit payload)
+# ------------------------------------------------------------------------------
+def price_edit_line(item, default_mrp=None):
+    """
+    Normalise one line of a PATCH payload into SalesInvoiceItem field values.
+    selling_price defaults to mrp * quantity; discount_price is the difference.
+    """
+    quantity = int(item["quantity"])
+    mrp = to_money(item["mrp"] if item.get("mrp") is not None else default_mrp)
+    selling_price = to_money(item["selling_price"] if item.get("selling_price") is not None else mrp * quantity)
+
+    return {
+        "quantity": quantity,
+        "mrp": mrp,
+        "discount": int(float(item.get("discount", 0))),
+        "discount_price": mrp * quantity - selling_price,
+        "selling_price": selling_price,
+    }
+
+
+def line_totals(line):
+    """(line mrp, discount, selling) for a SalesInvoiceItem or a priced line dict."""
+    get = line.get if isinstance(line, dict) else lambda field: getattr(line, field)
+    return (
+        Decimal(get("mrp")) * get("quantity"),
+        Decimal(get("discount_price")),
+        Decimal(get("selling_price")),
+    )
+
+
+def stamp_sales_lines(lines, sales_date, medicines=None):
+    """
+    Record the sale-time snapshot on new SalesInvoiceItem objects: the
+    invoice day and the batch's purchase_price as unit_cost. Batches not
+    in medicines ({medicine_id: MedicineInventory}) are read in one query.
+    """
+    if isinstance(sales_date, datetime.datetime):
+        sales_date = sales_date.date()
+    medicines = medicines or {}
+
+    costs = {medicine_id: medicine.purchase_price for medicine_id, medicine in medicines.items()}
+    missing = {line.medicine_id for line in lines} - costs.keys()
+    if missing:
+        costs.update(MedicineInventory.objects.filter(id__in=missing).values_list("id", "purchase_price"))
+
+    for line in lines:
+        line.sales_date = sales_date
+        line.unit_cost = to_money(costs.get(line.medicine_id) or 0)
+
+
+# ------------------------------------------------------------------------------
+# Diff Engine
+# ------------------------------------------------------------------------------
+def net_stock_deltas(old_items, new_items):
+    """
+    Per-medicine stock change needed to go from old_items to new_items.
+    Returns {medicine_id: delta}; only medicines whose quantity actually
+    changes are included (positive = stock comes back to the shelf).
+    """
+    deltas = defaultdict(int)
+    for old_item in old_items:
+        deltas[old_item.medicine_id] += old_item.quantity
+    for item in new_items:
+        deltas[int(item["medicine_id"])] -= int(item["quantity"])
+
+    return {medicine_id: delta for medicine_id, delta in deltas.items() if delta}
+
+
+def diff_sales_items(sales_invoice_id, old_items, new_items, medicines):
+    """
+    Compare the stored lines of an invoice with an edited item list.
+
+    Lines are matched per medicine in their original order. Matching lines
+    with identical values are left untouched; the rest end up in:
+        added   -> unsaved SalesInvoiceItem objects
+        changed -> existing SalesInvoiceItem objects with updated values
+        removed -> existing SalesInvoiceItem objects to delete
+    "totals" holds the amounts to add to the invoice header.
+
+    medicines must contain every medicine whose new line omits mrp.
+    """
+    old_by_medicine = defaultdict(list)
+    for old_item in old_items:
+        old_by_medicine[old_item.medicine_id].append(old_item)
+
+    new_by_medicine = defaultdict(list)
+    for item in new_items:
+        medicine_id = int(item["medicine_id"])
+        default_mrp = medicines[medicine_id].mrp if item.get("mrp") is None else None
+        new_by_medicine[medicine_id].append(price_edit_line(item, default_mrp))
+
+    diff = {
+        "added": [],
+        "changed": [],
+        "removed": [],
+        "totals": {
+            "total_medicines": 0,
+            "total_price": Decimal("0.00"),
+            "total_discount_price": Decimal("0.00"),
+            "final_selling_price": Decimal("0.00"),
+        },
+    }
+    totals = diff["totals"]
+
+    def add_to_totals(line, sign):
+        line_mrp, line_discount, line_selling = line_totals(line)
+        totals["total_price"] += sign * line_mrp
+        totals["total_discount_price"] += sign * line_discount
+        totals["final_selling_price"] += sign * line_selling
+
+    now = timezone.now()
+    for medicine_id in sorted(old_by_medicine.keys() | new_by_medicine.keys()):
+        for old_item, new_line in zip_longest(old_by_medicine[medicine_id], new_by_medicine[medicine_id]):
+            if new_line is None:
+                add_to_totals(old_item, -1)
+                totals["total_medicines"] -= 1
+                diff["removed"].append(old_item)
+
+            elif old_item is None:
+                add_to_totals(new_line, 1)
+                totals["total_medicines"] += 1
+                diff["added"].append(SalesInvoiceItem(
+                    sales_invoice_id=sales_invoice_id,
+                    medicine_id=medicine_id,
+                    **new_line
+                ))
+
+            elif any(getattr(old_item, field) != new_line[field] for field in SALES_LINE_FIELDS):
+                add_to_totals(old_item, -1)
+                for field in SALES_LINE_FIELDS:
+                    setattr(old_item, field, new_line[field])
+                old_item.updated_at = now
+                add_to_totals(old_item, 1)
+                diff["changed"].append(old_item)
+
+    return diff
@@ -0,0 +1,138 @@
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from apps.models import SalesInvoice, SalesDailySummary
+
+SUMMARY_AMOUNTS = {
+    # rollup column: sales_invoices column
+    "gross_amount": "total_price",
+    "discount_amount": "total_discount_price",
+    "net_amount": "final_selling_price",
+}
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def invoice_summary_key(invoice):
+    """(sales_date, payment_mode, {rollup column: amount}) of one SalesInvoice as it will be stored."""
+    invoice_date = invoice.invoice_date or datetime.datetime.now()
+    if isinstance(invoice_date, datetime.datetime):
+        invoice_date = invoice_date.date()
+    amounts = {column: _money(getattr(invoice, field)) for column, field in SUMMARY_AMOUNTS.items()}
+    return invoice_date, invoice.payment_mode, amounts
+
+
+# ------------------------------------------------------------------------------
+# Incremental Update (inside the sales transaction)
+# ------------------------------------------------------------------------------
+def _add_to_summary(sales_date, payment_mode, invoice_count, amounts):
+    rows = SalesDailySummary.objects.filter(sales_date=sales_date, payment_mode=payment_mode)
+    increments = {
+        "invoice_count": F("invoice_count") + invoice_count,
+        "updated_at": datetime.datetime.now(),
+        **{column: F(column) + amount for column, amount in amounts.items()},
+    }
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            SalesDailySummary.objects.create(
+                sales_date=sales_date, payment_mode=payment_mode, invoice_count=invoice_count, **amounts
+            )
+    except IntegrityError:
+        # Another sale of the same day and mode created the row first
+        rows.update(**increments)
+
+
+def record_sales_change(before=None, after=None):
+    """
+    Move a sales invoice's totals in the rollup. before / after are
+    invoice_summary_key() results (None for a created / deleted invoice).
+    Call last in the sales transaction: the rollup row of the day stays
+    locked until commit, so every other sale of that day waits on it.
+    """
+    changes = {}
+    for key, sign in ((before, -1), (after, 1)):
+        if key is None:
+            continue
+        sales_date, payment_mode, amounts = key
+        count, totals = changes.get((sales_date, payment_mode), (0, dict.fromkeys(SUMMARY_AMOUNTS, Decimal("0.00"))))
+        changes[(sales_date, payment_mode)] = (
+            count + sign,
+            {column: totals[column] + sign * amounts[column] for column in SUMMARY_AMOUNTS},
+        )
+
+    for (sales_date, payment_mode), (count, amounts) in changes.items():
+        # Edits that moved no money (customer name, unchanged lines) touch nothing
+        if count or any(amounts.values()):
+            _add_to_summary(sales_date, payment_mode, count, amounts)
+
+
+# ------------------------------------------------------------------------------
+# Rebuild
+# ------------------------------------------------------------------------------
+def rebuild_sales_summary(from_date=None, to_date=None):
+    """
+    Recompute the rollup from sales_invoices, for the whole table or the
+    from_date..to_date days (both inclusive). Returns the number of rows.
+    """
+    invoices = SalesInvoice.objects.all()
+    summaries = SalesDailySummary.objects.all()
+    if from_date:
+        invoices = invoices.filter(invoice_date__gte=from_date)
+        summaries = summaries.filter(sales_date__gte=from_date)
+    if to_date:
+        invoices = invoices.filter(invoice_date__lt=to_date + datetime.timedelta(days=1))
+        summaries = summaries.filter(sales_date__lte=to_date)
+
+    rows = invoices.annotate(sales_date=TruncDate("invoice_date")).values("sales_date", "payment_mode").annotate(
+        invoice_count=Count("id"),
+        **{column: Sum(field) for column, field in SUMMARY_AMOUNTS.items()}
+    ).order_by()
+
+    with transaction.atomic():
+        summaries.delete()
+        SalesDailySummary.objects.bulk_create(
+            [SalesDailySummary(**row) for row in rows], batch_size=1000
+        )
+        return summaries.count()
+
+
+# ------------------------------------------------------------------------------
+# Reporting
+# ------------------------------------------------------------------------------
+def sales_summary(from_date, to_date):
+    """
+    Per day, per payment mode and overall totals for from_date..to_date,
+    read from the rollup only: cost grows with days, not invoices.
+    """
+    summaries = SalesDailySummary.objects.filter(sales_date__gte=from_date, sales_date__lte=to_date)
+    # Output names differ from the column names: annotations may not shadow fields
+    totals = {
+        "invoices": Sum("invoice_count"),
+        "gross": Sum("gross_amount"),
+        "discount": Sum("discount_amount"),
+        "net": Sum("net_amount"),
+    }
+
+    def zero_filled(row):
+        return {
+            key: _money(value) if key in ("gross", "discount", "net") else value or 0
+            for key, value in row.items()
+        }
+
+    return {
+        "days": [
+            zero_filled(row) for row in
+            summaries.values("sales_date").annotate(**totals).order_by("sales_date")
+        ],
+        "payment_modes": [
+            zero_filled(row) for row in
+            summaries.values("payment_mode").annotate(**totals).order_by("payment_mode")
+        ],
+        "totals": zero_filled(summaries.aggregate(**totals)),
+    }
@@ -0,0 +1,83 @@
+from django.utils import timezone
+from apps.models import MedicineInventory, StockAlert
+
+
+def alert_level(current_stock, low_stock_alert, is_active=True):
+    """"out", "low" or None for one medicine row."""
+    if not is_active:
+        return None
+    if current_stock <= 0:
+        return "out"
+    if current_stock < (low_stock_alert or 0):
+        return "low"
+    return None
+
+
+def sync_stock_alerts(medicine_ids):
+    """
+    Re-evaluate the given medicines against their own low_stock_alert and
+    write only the rows whose alert level changed. Call after the stock
+    UPDATE, inside the same transaction, so the set commits with it.
+    """
+    medicine_ids = {int(medicine_id) for medicine_id in medicine_ids}
+    if not medicine_ids:
+        return
+
+    wanted = {
+        medicine_id: alert_level(current_stock, low_stock_alert, is_active)
+        for medicine_id, current_stock, low_stock_alert, is_active in
+        MedicineInventory.objects.filter(id__in=medicine_ids).values_list(
+            "id", "current_stock", "low_stock_alert", "is_active"
+        )
+    }
+    existing = dict(
+        StockAlert.objects.filter(medicine_id__in=medicine_ids).values_list("medicine_id", "alert_level")
+    )
+
+    cleared = [medicine_id for medicine_id in existing if not wanted.get(medicine_id)]
+    if cleared:
+        StockAlert.objects.filter(medicine_id__in=cleared).delete()
+
+    now = timezone.now()
+    crossed = {
+        medicine_id: level for medicine_id, level in wanted.items()
+        if level and existing.get(medicine_id) != level
+    }
+
+    # Not an upsert: MySQL cannot target uq_stock_alerts_medicine in bulk_create(update_conflicts=...)
+    changed = [medicine_id for medicine_id in crossed if medicine_id in existing]
+    for level in {crossed[medicine_id] for medicine_id in changed}:
+        StockAlert.objects.filter(
+            medicine_id__in=[medicine_id for medicine_id in changed if crossed[medicine_id] == level]
+        ).update(alert_level=level, updated_at=now)
+
+    added = [
+        StockAlert(medicine_id=medicine_id, alert_level=level, created_at=now, updated_at=now)
+        for medicine_id, level in crossed.items() if medicine_id not in existing
+    ]
+    if added:
+        StockAlert.objects.bulk_create(added)
+
+
+def rebuild_stock_alerts(chunk_size=5000):
+    """Recompute the whole set from medicine_inventory. Returns the number of alerts."""
+    StockAlert.objects.all().delete()
+
+    now = timezone.now()
+    alerts = []
+    rows = MedicineInventory.objects.filter(is_active=True).values_list(
+        "id", "current_stock", "low_stock_alert"
+    ).iterator(chunk_size=chunk_size)
+
+    created = 0
+    for medicine_id, current_stock, low_stock_alert in rows:
+        level = alert_level(current_stock, low_stock_alert)
+        if level:
+            alerts.append(StockAlert(medicine_id=medicine_id, alert_level=level, created_at=now, updated_at=now))
+        if len(alerts) >= chunk_size:
+            StockAlert.objects.bulk_create(alerts)
+            created += len(alerts)
+            alerts = []
+
+    StockAlert.objects.bulk_create(alerts)
+    return created + len(alerts)
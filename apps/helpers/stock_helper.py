@@ -0,0 +1,142 @@
+import datetime
+from django.db.models import Case, F, IntegerField, Q, When
+from apps.models import MedicineInventory
+from apps.helpers.catalog_helper import medicines_changed
+from apps.helpers.stock_ledger_helper import record_stock_movements
+
+
+# ------------------------------------------------------------------------------
+# Row Locking
+# ------------------------------------------------------------------------------
+def medicine_name_key(name):
+    """What makes batches the same medicine: the name, trimmed and case-insensitive."""
+    return str(name or "").strip().casefold()
+
+
+def medicine_names_q(names):
+    """Every batch of the named medicines, matched like medicine_name_key (nothing for no names)."""
+    condition = Q(pk__in=[])
+    for name in sorted({medicine_name_key(name) for name in names}):
+        condition |= Q(name__iexact=name)
+    return condition
+
+
+def sellable_batches_q(today=None):
+    """Active, not expired, in-stock batches."""
+    today = today or datetime.date.today()
+    return (
+        Q(is_active=True, is_expired=False, current_stock__gt=0) &
+        (Q(expiry_date__isnull=True) | Q(expiry_date__gte=today))
+    )
+
+
+def lock_medicines(medicine_ids, medicine_names=()):
+    """
+    Lock every requested MedicineInventory row with a single
+    SELECT ... FOR UPDATE, always in primary key order.
+
+    medicine_names additionally locks every sellable batch of those
+    medicines, matched case-insensitively like allocate_fefo (see
+    medicine_names_q), served by uq_med_inv_name_batch.
+
+    Concurrent transactions acquire the locks in the same order,
+    so two sales touching the same medicines can never deadlock.
+
+    Returns {medicine_id: MedicineInventory}.
+    Raises MedicineInventory.DoesNotExist if any id is missing.
+    """
+    ids = sorted({int(medicine_id) for medicine_id in medicine_ids})
+    names = {medicine_name_key(name) for name in medicine_names}
+    if not ids and not names:
+        return {}
+
+    condition = Q(id__in=ids)
+    if names:
+        condition |= medicine_names_q(names) & sellable_batches_q()
+
+    medicines = {
+        medicine.id: medicine
+        for medicine in MedicineInventory.objects.select_for_update().filter(condition).order_by("id")
+    }
+
+    missing = [medicine_id for medicine_id in ids if medicine_id not in medicines]
+    if missing:
+        raise MedicineInventory.DoesNotExist(f"Medicine not found: {missing}")
+
+    return medicines
+
+
+# ------------------------------------------------------------------------------
+# FEFO Allocation
+# ------------------------------------------------------------------------------
+def allocate_fefo(medicine_name, quantity, medicines, available):
+    """
+    Split quantity across the sellable batches of medicine_name,
+    First Expiry First Out (batches without expiry date go last).
+
+    medicines is the dict returned by lock_medicines; available is
+    {medicine_id: stock left} and is decremented in place so several
+    lines of the same invoice share the same batches correctly.
+
+    Returns [(medicine_id, quantity), ...].
+    Raises ValueError if the batches together cannot cover quantity.
+    """
+    today = datetime.date.today()
+    name = medicine_name_key(medicine_name)
+
+    batches = sorted(
+        (
+            medicine for medicine in medicines.values()
+            if medicine_name_key(medicine.name) == name
+            and medicine.is_active and not medicine.is_expired
+            and (medicine.expiry_date is None or medicine.expiry_date >= today)
+            and available[medicine.id] > 0
+        ),
+        key=lambda medicine: (medicine.expiry_date or datetime.date.max, medicine.id)
+    )
+
+    total_available = sum(available[medicine.id] for medicine in batches)
+    if total_available < quantity:
+        raise ValueError(f"Insufficient stock for {medicine_name}. Available: {total_available}")
+
+    allocations = []
+    remaining = quantity
+    for medicine in batches:
+        take = min(remaining, available[medicine.id])
+        available[medicine.id] -= take
+        allocations.append((medicine.id, take))
+        remaining -= take
+        if not remaining:
+            break
+
+    return allocations
+
+
+# ------------------------------------------------------------------------------
+# Set-Based Stock Update
+# ------------------------------------------------------------------------------
+def apply_stock_deltas(deltas, reason, reference_id=None):
+    """
+    Apply {medicine_id: delta} to current_stock with one UPDATE statement.
+
+    A positive delta is stock inward, a negative delta is stock outward.
+    Zero deltas are skipped. Callers are expected to hold the row locks
+    (see lock_medicines) and to have validated the resulting stock.
+    Each delta is also appended to the stock_movements ledger under
+    reason / reference_id, and the rows are registered with
+    medicines_changed (alerts, catalog version, autocomplete).
+    """
+    deltas = {int(medicine_id): int(delta) for medicine_id, delta in deltas.items() if int(delta)}
+    if not deltas:
+        return 0
+
+    updated = MedicineInventory.objects.filter(id__in=deltas.keys()).update(
+        current_stock=Case(
+            *[When(id=medicine_id, then=F("current_stock") + delta) for medicine_id, delta in deltas.items()],
+            default=F("current_stock"),
+            output_field=IntegerField(),
+        )
+    )
+    record_stock_movements(deltas, reason, reference_id)
+    medicines_changed(deltas)
+    return updated
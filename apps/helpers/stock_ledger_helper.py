@@ -0,0 +1,118 @@
+import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from apps.models import MedicineInventory, StockMovement, StockSnapshot
+from apps.helpers.periodic_helper import start_periodic_task
+
+import logging
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CHUNK_SIZE = 5000
+
+
+# ------------------------------------------------------------------------------
+# Ledger
+# ------------------------------------------------------------------------------
+def record_stock_movements(deltas, reason, reference_id=None):
+    """
+    Append {medicine_id: signed quantity} to stock_movements with one
+    INSERT. Call in the same transaction as the current_stock change.
+    """
+    now = timezone.now()
+    movements = [
+        StockMovement(
+            medicine_id=int(medicine_id),
+            quantity=int(quantity),
+            reason=reason,
+            reference_id=reference_id,
+            created_at=now,
+        )
+        for medicine_id, quantity in deltas.items() if int(quantity)
+    ]
+    if movements:
+        StockMovement.objects.bulk_create(movements)
+
+
+# ------------------------------------------------------------------------------
+# Stock As Of
+# ------------------------------------------------------------------------------
+def stock_as_of(at, medicine_ids=None):
+    """
+    Stock per medicine at datetime at: the latest snapshot batch taken at
+    or before at, plus the movements after it up to at. The replay is
+    bounded by the snapshot interval, not by the length of the history.
+
+    Returns {"stock": {medicine_id: stock}, "snapshot_at": ..., "replayed_movements": n}.
+    Raises ValueError if at is before the first snapshot (start of history).
+    """
+    snapshot_at = StockSnapshot.objects.filter(taken_at__lte=at).aggregate(latest=Max("taken_at"))["latest"]
+    if snapshot_at is None:
+        start =StockSnapshot.objects.order_by("taken_at").values_list("taken_at", flat=True).first()
+        if start is None:
+            raise ValueError("Stock history is not started yet (run manage.py snapshot_stock --initial).")
+        raise ValueError(f"Stock history starts at {start:%Y-%m-%d %H:%M:%S}.")
+
+    snapshots = StockSnapshot.objects.filter(taken_at=snapshot_at)
+    movements = StockMovement.objects.filter(created_at__gt=snapshot_at, created_at__lte=at)
+    if medicine_ids is not None:
+        medicine_ids = {int(medicine_id) for medicine_id in medicine_ids}
+        snapshots = snapshots.filter(medicine_id__in=medicine_ids)
+        movements = movements.filter(medicine_id__in=medicine_ids)
+
+    stock = dict(snapshots.values_list("medicine_id", "stock"))
+    replayed = 0
+    for row in movements.values("medicine_id").annotate(total=Sum("quantity"), moves=Count("id")).order_by():
+        stock[row["medicine_id"]] = stock.get(row["medicine_id"], 0) + row["total"]
+        replayed += row["moves"]
+
+    if medicine_ids is not None:
+        for medicine_id in medicine_ids:
+            stock.setdefault(medicine_id, 0)
+
+    return {"stock": stock, "snapshot_at": snapshot_at, "replayed_movements": replayed}
+
+
+# ------------------------------------------------------------------------------
+# Snapshots
+# ------------------------------------------------------------------------------
+def take_stock_snapshot(initial=False):
+    """
+    Write one snapshot batch and return (taken_at, rows), or (None, 0)
+    if there is nothing new to snapshot.
+
+    initial (or no snapshot yet): copies current_stock as of now; this
+    starts the history. Otherwise the batch is built from the previous
+    batch plus the ledger up to now - STOCK_SNAPSHOT_LAG, so movements of
+    transactions still in flight are never missed.
+    """
+    latest = StockSnapshot.objects.aggregate(latest=Max("taken_at"))["latest"]
+
+    if initial or latest is None:
+        taken_at = timezone.now()
+        stock = dict(MedicineInventory.objects.values_list("id", "current_stock"))
+    else:
+        taken_at = timezone.now() - datetime.timedelta(seconds=settings.STOCK_SNAPSHOT_LAG)
+        if taken_at <= latest:
+            return None, 0
+        stock = stock_as_of(taken_at)["stock"]
+
+    snapshots = [
+        StockSnapshot(medicine_id=medicine_id, stock=quantity, taken_at=taken_at)
+        for medicine_id, quantity in stock.items()
+    ]
+    with transaction.atomic():
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=SNAPSHOT_CHUNK_SIZE)
+
+    return taken_at, len(snapshots)
+
+
+def _periodic_snapshot():
+    taken_at, rows = take_stock_snapshot()
+    if rows:
+        logger.info("Stock snapshot as of %s: %d medicines", taken_at, rows)
+
+
+def start_stock_snapshots():
+    start_periodic_task("stock-snapshots", settings.STOCK_SNAPSHOT_INTERVAL, _periodic_snapshot)
@@ -0,0 +1,23 @@
+import pdfkit
+
+# Kept free of Django imports: this module is loaded by worker processes
+# (ProcessPoolExecutor spawns fresh interpreters on Windows).
+
+INVOICE_PDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '0.5in',
+    'margin-right': '0.5in',
+    'margin-bottom': '0.5in',
+    'margin-left': '0.5in',
+    'encoding': "UTF-8",
+    'enable-local-file-access': None,
+    'no-outline': None,
+    'disable-smart-shrinking': None, # This prevents "tight" text rendering
+    'dpi': '300', # Higher DPI often clears up letter spacing
+}
+
+
+def render_html_to_pdf(html_content, wkhtmltopdf_path):
+    """Runs wkhtmltopdf and returns the PDF bytes."""
+    config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
+    return pdfkit.from_string(html_content, False, options=INVOICE_PDF_OPTIONS, configuration=config)
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from apps.models import MedicineInventory, CatalogVersion
+from apps.helpers.purchase_helper import recompute_last_supplier
+from apps.helpers.catalog_helper import MEDICINES
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill medicine_inventory.last_supplier_id / last_supplier_name from the "
+        "latest purchase invoice of each medicine. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Medicines updated per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        updated = 0
+
+        # Short transactions over primary key ranges, so live traffic is not blocked
+        while True:
+            ids = list(
+                MedicineInventory.objects.filter(id__gt=last_id)
+                .order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic():
+                updated += recompute_last_supplier(ids)
+
+            last_id = ids[-1]
+            self.stdout.write(f"Updated {updated} medicines (up to id {last_id})")
+
+        CatalogVersion.bump(MEDICINES)
+        self.stdout.write(self.style.SUCCESS(f"Backfill complete: {updated} medicines updated."))
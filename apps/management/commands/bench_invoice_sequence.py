@@ -0,0 +1,52 @@
+import time
+import datetime
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+from apps.models import InvoiceSequence
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark InvoiceSequence.next_number at growing daily volume. "
+        "Runs inside a transaction that is rolled back, so no numbers are consumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--total", type=int, default=100000, help="Numbers to allocate in total")
+        parser.add_argument("--sample", type=int, default=1000, help="Allocations timed per checkpoint")
+
+    def handle(self, *args, **options):
+        total = options["total"]
+        sample = options["sample"]
+        sequence_key = f"BENCH-{datetime.datetime.now():%Y%m%d%H%M%S}"
+
+        self.stdout.write(f"{'issued':>10} {'us/alloc':>10} {'queries/alloc':>14}")
+
+        with transaction.atomic():
+            issued = 0
+            checkpoint = sample
+            while issued < total:
+                # Fill up to the next checkpoint untimed, then time one sample
+                while issued < checkpoint - sample:
+                    InvoiceSequence.next_number(sequence_key)
+                    issued += 1
+
+                query_count = [0]
+
+                def count_queries(execute, sql, params, many, context):
+                    query_count[0] += 1
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(count_queries):
+                    started = time.perf_counter()
+                    for _ in range(sample):
+                        InvoiceSequence.next_number(sequence_key)
+                    elapsed = time.perf_counter() - started
+                issued += sample
+
+                self.stdout.write(
+                    f"{issued:>10} {elapsed / sample * 1e6:>10.1f} {query_count[0] / sample:>14.2f}"
+                )
+                checkpoint *= 10
+
+            transaction.set_rollback(True)
@@ -0,0 +1,22 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.helpers.expiry_risk_helper import forecast_expiry_risk
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the expiry-risk forecast: batches projected to expire unsold at their recent sales velocity. "
+        "Run from cron (e.g. nightly, after sweep_expired)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Forecast as of this day instead of today (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            today = datetime.date.fromisoformat(options["date"]) if options["date"] else None
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD.")
+
+        forecast_at, rows = forecast_expiry_risk(today)
+        self.stdout.write(self.style.SUCCESS(f"Expiry risk forecast as of {forecast_at:%Y-%m-%d %H:%M:%S}: {rows} batches at risk."))
@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.helpers.medicine_import_helper import import_medicines_csv, IMPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a medicine catalog CSV (header row required; name, batch_number and mrp columns mandatory). "
+        "Existing batches, matched on (name, batch_number), are updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Path of the CSV file (UTF-8)")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows upserted per transaction")
+        parser.add_argument("--report", help="Write the per-row error report to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8-sig") as csv_file:
+                report = import_medicines_csv(csv_file, chunk_size=options["chunk_size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report["errors"][:20]:
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {'; '.join(error['errors'])}"))
+        if report["failed"] > 20:
+            self.stdout.write(self.style.WARNING(f"... {report['failed'] - 20} more invalid rows"))
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['total_rows']} rows: {report['created']} created, "
+            f"{report['updated']} updated, {report['failed']} failed."
+        ))
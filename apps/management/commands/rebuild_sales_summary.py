@@ -0,0 +1,24 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from apps.helpers.sales_summary_helper import rebuild_sales_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the sales_daily_summary rollup from sales_invoices (all days, or --from-date..--to-date). "
+        "Needed once after creating the table; afterwards every sales create / edit keeps it up to date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from-date", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--to-date", help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            from_date = datetime.date.fromisoformat(options["from_date"]) if options["from_date"] else None
+            to_date = datetime.date.fromisoformat(options["to_date"]) if options["to_date"] else None
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD.")
+
+        rows = rebuild_sales_summary(from_date, to_date)
+        self.stdout.write(self.style.SUCCESS(f"Sales summary rebuilt: {rows} day / payment mode rows."))
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from apps.helpers.stock_alert_helper import rebuild_stock_alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the low-stock / out-of-stock alert set from medicine_inventory. "
+        "Needed once after creating the stock_alerts table; afterwards it is kept up to date by every stock change."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_stock_alerts()
+        self.stdout.write(self.style.SUCCESS(f"Stock alerts rebuilt: {total} medicines low or out of stock."))
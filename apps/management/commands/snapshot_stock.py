@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.helpers.stock_ledger_helper import take_stock_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a per-medicine stock snapshot batch for the stock-as-of API. "
+        "Run from cron (e.g. hourly or nightly); --initial starts the history from current_stock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--initial", action="store_true",
+                            help="Baseline from current_stock now instead of the previous snapshot plus the ledger")
+
+    def handle(self, *args, **options):
+        taken_at, rows = take_stock_snapshot(initial=options["initial"])
+        if not rows:
+            self.stdout.write("Nothing to snapshot yet (latest snapshot is within STOCK_SNAPSHOT_LAG).")
+            return
+        self.stdout.write(self.style.SUCCESS(f"Stock snapshot as of {taken_at:%Y-%m-%d %H:%M:%S}: {rows} medicines."))
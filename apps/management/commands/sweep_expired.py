@@ -0,0 +1,24 @@
+import datetime
+from django.core.management.base import BaseCommand
+from apps.helpers.expiry_helper import sweep_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark medicine batches whose expiry date has passed as expired. "
+        "Only batches that expired since the previous run are read, unless --full is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Ignore the high-water mark and check every batch")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Rows updated per transaction")
+        parser.add_argument("--date", type=datetime.date.fromisoformat, default=None,
+                            help="Sweep as of this date (YYYY-MM-DD), default today")
+
+    def handle(self, *args, **options):
+        result = sweep_expired(today=options["date"], full=options["full"], chunk_size=options["chunk_size"])
+
+        window = f"{result['from_date'] or 'beginning'} .. {result['to_date']}"
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {result['expired']} medicines expired (expiry dates {window}, exclusive end)."
+        ))
@@ -1,7 +1,8 @@
-import random
 import datetime
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.utils import timezone
 
 
 class Users(models.Model):
@@ -110,6 +111,10 @@ class MedicineInventory(models.Model):
     is_active = models.BooleanField(default=True, db_index=True)
     is_expired = models.BooleanField(default=False, db_index=True)
 
+    # Supplier of the latest purchase invoice, kept by PurchaseInvoiceCRUDView
+    last_supplier_id = models.BigIntegerField(blank=True, null=True, db_index=True)
+    last_supplier_name = models.CharField(max_length=255, blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -117,16 +122,21 @@ class MedicineInventory(models.Model):
         db_table = "medicine_inventory"
         indexes = [
             models.Index(fields=["name"], name="idx_med_inv_name"),
-            models.Index(fields=["name", "batch_number"], name="idx_med_inv_name_batch"),
             models.Index(fields=["expiry_date"], name="idx_med_inv_expiry"),
             models.Index(fields=["current_stock"], name="idx_med_inv_stock"),
             models.Index(fields=["is_active"], name="idx_med_inv_active"),
             models.Index(fields=["is_active", "expiry_date"], name="idx_med_inv_active_expiry"),
             models.Index(fields=["is_active", "current_stock"], name="idx_med_inv_active_stock"),
+            models.Index(fields=["is_active", "name"], name="idx_med_inv_active_name"),
+            models.Index(fields=["last_supplier_id"], name="idx_med_inv_last_supplier"),
             models.Index(fields=["rack_location"], name="idx_med_inv_rack"),
             models.Index(fields=["expiry_date"], name="idx_med_expiry"),
             models.Index(fields=["created_at"], name="idx_med_created_at"),
         ]
+        constraints = [
+            # One row per batch; also the upsert key of the catalog import
+            models.UniqueConstraint(fields=["name", "batch_number"], name="uq_med_inv_name_batch"),
+        ]
 
 class Supplier(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -215,20 +225,262 @@ class SalesInvoice(models.Model):
 
     def generate_invoice_id(self):
         """
-        Generates a unique ID: PMS-YYYYMMDD-RANDOM
-        Example: PMS-20231027-84291
+        Generates a sequential ID: PREFIX-YYYYMMDD-NNNNN
+        Example: PMS-20231027-00042
+
+        PREFIX comes from StoreProfile.invoice_prefix. The running number
+        is handed out by InvoiceSequence, one counter per prefix per day.
         """
+        prefix = StoreProfile.objects.values_list("invoice_prefix", flat=True).first() or "PMS"
         date_str = datetime.datetime.now().strftime('%Y%m%d')
-        # Generate a random 5-digit integer
-        random_bits = random.randint(10000, 99999)
-        new_id = f"PMS-{date_str}-{random_bits}"
-        
-        # Double check uniqueness in the database
-        while SalesInvoice.objects.filter(invoice_id=new_id).exists():
-            random_bits = random.randint(10000, 99999)
-            new_id = f"PMS-{date_str}-{random_bits}"
-            
-        return new_id
+        sequence_key = f"{prefix}-{date_str}"
+
+        return f"{sequence_key}-{InvoiceSequence.next_number(sequence_key):05d}"
+
+class InvoiceSequence(models.Model):
+    """
+    Gap-free counters for document numbering, one row per key
+    (e.g. "PMS-20231027"). next_number() costs one UPDATE and one SELECT,
+    no matter how many numbers were already handed out for the key.
+    """
+    id = models.BigAutoField(primary_key=True)
+    sequence_key = models.CharField(max_length=64, unique=True)
+    last_number = models.BigIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "invoice_sequences"
+
+    @classmethod
+    def next_number(cls, sequence_key):
+        """
+        Atomically increments the counter for sequence_key and returns the new value.
+        The row stays locked until the caller's transaction commits, so numbers
+        are never reused and never skipped by a rolled back invoice.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(sequence_key=sequence_key).update(
+                last_number=F("last_number") + 1,
+                updated_at=datetime.datetime.now()
+            )
+            if not updated:
+                try:
+                    # First number for this key
+                    with transaction.atomic():
+                        cls.objects.create(sequence_key=sequence_key, last_number=1)
+                    return 1
+                except IntegrityError:
+                    # Another request created the row first
+                    cls.objects.filter(sequence_key=sequence_key).update(
+                        last_number=F("last_number") + 1,
+                        updated_at=datetime.datetime.now()
+                    )
+
+            return cls.objects.filter(sequence_key=sequence_key).values_list("last_number", flat=True).get()
+
+class CatalogVersion(models.Model):
+    """
+    Change counter per cached catalog list ("medicines", "suppliers").
+    Bumped after every committed write; the value is the list's ETag.
+    """
+    id = models.BigAutoField(primary_key=True)
+    catalog = models.CharField(max_length=32, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "catalog_versions"
+
+    @classmethod
+    def bump(cls, catalog):
+        """Returns the new version."""
+        with transaction.atomic():
+            updated = cls.objects.filter(catalog=catalog).update(
+                version=F("version") + 1,
+                updated_at=datetime.datetime.now()
+            )
+            if updated:
+                # Read under the row lock the UPDATE holds: this bump's value
+                return cls.current(catalog)
+        try:
+            with transaction.atomic():
+                cls.objects.create(catalog=catalog, version=1)
+            return 1
+        except IntegrityError:
+            # Another request created the row first
+            return cls.bump(catalog)
+
+    @classmethod
+    def current(cls, catalog):
+        return cls.objects.filter(catalog=catalog).values_list("version", flat=True).first() or 0
+
+class JobCheckpoint(models.Model):
+    """
+    High-water mark of a background job (e.g. the expiry sweeper), so each
+    run only processes what changed since the previous one.
+    """
+    id = models.BigAutoField(primary_key=True)
+    job_name = models.CharField(max_length=64, unique=True)
+    checkpoint = models.CharField(max_length=64, blank=True, null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "job_checkpoints"
+
+    @classmethod
+    def get_value(cls, job_name):
+        return cls.objects.filter(job_name=job_name).values_list("checkpoint", flat=True).first()
+
+    @classmethod
+    def set_value(cls, job_name, checkpoint):
+        cls.objects.update_or_create(job_name=job_name, defaults={"checkpoint": checkpoint})
+
+class StockAlert(models.Model):
+    """
+    Active medicines currently at or past their own reorder point:
+    "out" when current_stock <= 0, "low" when below low_stock_alert.
+    Maintained by apps.helpers.stock_alert_helper on every stock change.
+    """
+    LEVEL_CHOICES = (
+        ("out", "Out of stock"),
+        ("low", "Low stock"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    medicine_id = models.BigIntegerField(unique=True)
+    alert_level = models.CharField(max_length=8, choices=LEVEL_CHOICES, db_index=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "stock_alerts"
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of current_stock changes: one row per medicine per
+    stock-changing operation, quantity signed (+ inward, - outward).
+    """
+    REASON_CHOICES = (
+        ("opening", "Opening stock"),
+        ("sale", "Sale"),
+        ("sale_edit", "Sale edited"),
+        ("purchase", "Purchase"),
+        ("purchase_edit", "Purchase edited"),
+        ("expiry_return", "Expiry return"),
+        ("adjustment", "Manual adjustment"),
+        ("import", "Inventory import"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    medicine_id = models.BigIntegerField()
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=16, choices=REASON_CHOICES)
+    reference_id = models.BigIntegerField(blank=True, null=True, help_text="Invoice / return id of the operation")
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "stock_movements"
+        indexes = [
+            models.Index(fields=["medicine_id", "created_at"], name="idx_stock_mv_med_created"),
+            models.Index(fields=["created_at"], name="idx_stock_mv_created"),
+        ]
+
+class StockSnapshot(models.Model):
+    """
+    current_stock of every medicine as of taken_at, written in batches
+    (all rows of one batch share taken_at). Stock at time T is the
+    latest batch before T plus the movements in between.
+    """
+    id = models.BigAutoField(primary_key=True)
+    medicine_id = models.BigIntegerField()
+    stock = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "stock_snapshots"
+        indexes = [
+            models.Index(fields=["taken_at", "medicine_id"], name="idx_stock_snap_taken_med"),
+        ]
+
+class SalesDailySummary(models.Model):
+    """
+    Sales rollup per day and payment mode. Kept up to date in the same
+    transaction as every sales invoice create / edit; rebuilt from
+    sales_invoices by manage.py rebuild_sales_summary.
+    """
+    id = models.BigAutoField(primary_key=True)
+    sales_date = models.DateField()
+    payment_mode = models.CharField(max_length=16)
+    invoice_count = models.IntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "sales_daily_summary"
+        constraints = [
+            models.UniqueConstraint(fields=["sales_date", "payment_mode"], name="uq_sales_daily_date_mode"),
+        ]
+
+class MedicineDailySales(models.Model):
+    """
+    Units sold and revenue per medicine per day (invoice date). Kept up to
+    date in the sales create / edit transaction; rebuilt from the invoice
+    tables by manage.py rebuild_medicine_daily_sales.
+    """
+    id = models.BigAutoField(primary_key=True)
+    medicine_id = models.BigIntegerField()
+    sales_date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "medicine_daily_sales"
+        constraints = [
+            models.UniqueConstraint(fields=["medicine_id", "sales_date"], name="uq_med_daily_med_date"),
+        ]
+        indexes = [
+            # Covers top-N over a date range: no table reads
+            models.Index(fields=["sales_date", "medicine_id", "quantity", "revenue"], name="idx_med_daily_date_cover"),
+        ]
+
+class ExpiryRiskForecast(models.Model):
+    """
+    Latest expiry-risk forecast: batches projected to expire with stock
+    left at their medicine's recent sales velocity. Written as one batch (all rows
+    share forecast_at) by manage.py forecast_expiry_risk; the previous
+    batch is deleted in the same transaction.
+    """
+    id = models.BigAutoField(primary_key=True)
+    forecast_at = models.DateTimeField()
+    medicine_id = models.BigIntegerField()
+    name = models.CharField(max_length=255)
+    batch_number = models.CharField(max_length=128)
+    expiry_date = models.DateField()
+    days_to_expiry = models.IntegerField()
+    current_stock = models.IntegerField()
+    daily_velocity = models.DecimalField(max_digits=10, decimal_places=2, help_text="Of the medicine, all batches")
+    projected_sold = models.IntegerField()
+    quantity_at_risk = models.IntegerField()
+    value_at_risk = models.DecimalField(max_digits=14, decimal_places=2, help_text="quantity_at_risk * purchase_price")
+    supplier_id = models.BigIntegerField(blank=True, null=True)
+    supplier_name = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta:
+        db_table = "expiry_risk_forecast"
+        indexes = [
+            models.Index(fields=["forecast_at", "supplier_id"], name="idx_exp_risk_at_supplier"),
+        ]
 
 class SalesInvoiceItem(models.Model):
     sales_invoice_id = models.BigIntegerField(db_index=True)
@@ -238,6 +490,10 @@ class SalesInvoiceItem(models.Model):
     discount = models.IntegerField(default=10)
     discount_price = models.DecimalField(max_digits=10, decimal_places=2)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    # Sale-time snapshot for margin reports (no join back to invoices / inventory)
+    sales_date = models.DateField(help_text="Invoice date of the parent sales invoice")
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"), help_text="Batch purchase_price when sold")
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -247,6 +503,11 @@ class SalesInvoiceItem(models.Model):
         indexes = [
             models.Index(fields=["sales_invoice_id"], name="idx_sii_si"),
             models.Index(fields=["medicine_id"], name="idx_sii_med"),
+            # Covers the gross margin report: every grouping reads this index alone
+            models.Index(
+                fields=["sales_date", "sales_invoice_id", "medicine_id", "quantity", "selling_price", "unit_cost"],
+                name="idx_sii_date_margin"
+            ),
         ]
 
 class ExpiryReturn(models.Model):
@@ -1,3 +1,317 @@
-from django.test import TestCase
+import io
+import os
+import datetime
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.models import (
+    MedicineInventory, MedicineDailySales, ExpiryRiskForecast, SalesInvoice, SalesInvoiceItem,
+    StockMovement, SalesDailySummary, StoreProfile, InvoiceSequence,
+)
+from apps.helpers.sales_helper import diff_sales_items
+from apps.helpers.stock_helper import lock_medicines
+from apps.helpers import reorder_helper
+from apps.helpers.medicine_import_helper import import_medicines_csv
+from apps.helpers.expiry_risk_helper import forecast_expiry_risk
+from apps.helpers.medicine_sales_helper import record_medicine_sales, top_medicines
 
-# Create your tests here.
+
+def _csv(*rows):
+    return io.StringIO("name,batch_number,mrp,current_stock\n" + "".join(f"{row}\n" for row in rows))
+
+
+# MySQL has no ON CONFLICT (...) target: bulk_create must not pass unique_fields there
+without_conflict_target = mock.patch.object(connection.features, "supports_update_conflicts_with_target", False)
+
+
+class MedicineImportTests(TestCase):
+
+    @without_conflict_target
+    def test_import_creates_batches_without_conflict_target(self):
+        report = import_medicines_csv(_csv("Paracetamol,B1,12.50,10", "Cetirizine,C7,30,5"))
+
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (2, 0, 0))
+        self.assertEqual(
+            set(MedicineInventory.objects.values_list("name", "batch_number", "mrp", "current_stock")),
+            {("Paracetamol", "B1", Decimal("12.50"), 10), ("Cetirizine", "C7", Decimal("30.00"), 5)},
+        )
+
+    @unittest.skipUnless(connection.vendor == "mysql", "upsert without a conflict target is MySQL's ON DUPLICATE KEY UPDATE")
+    @without_conflict_target
+    def test_reimport_updates_existing_batch_without_conflict_target(self):
+        import_medicines_csv(_csv("Paracetamol,B1,12.50,10"))
+        report = import_medicines_csv(_csv("Paracetamol,B1,14.00,25", "Cetirizine,C7,30,5"))
+
+        self.assertEqual((report["created"], report["updated"]), (1, 1))
+        medicine = MedicineInventory.objects.get(name="Paracetamol", batch_number="B1")
+        self.assertEqual((medicine.mrp, medicine.current_stock), (Decimal("14.00"), 25))
+        self.assertEqual(MedicineInventory.objects.count(), 2)
+
+
+@override_settings(EXPIRY_RISK_VELOCITY_DAYS=90, EXPIRY_RISK_HORIZON_DAYS=180)
+class ExpiryRiskForecastTests(TestCase):
+
+    def setUp(self):
+        reorder_helper._units_sold_cache.clear()
+        self.today = datetime.date.today()
+
+    def _batch(self, name, batch_number, stock, expires_in):
+        return MedicineInventory.objects.create(
+            name=name, batch_number=batch_number, mrp=10, purchase_price=5,
+            current_stock=stock, expiry_date=self.today + datetime.timedelta(days=expires_in),
+        )
+
+    def _risk(self):
+        forecast_expiry_risk(self.today)
+        return {
+            batch_number: (projected_sold, quantity_at_risk)
+            for batch_number, projected_sold, quantity_at_risk in
+            ExpiryRiskForecast.objects.values_list("batch_number", "projected_sold", "quantity_at_risk")
+        }
+
+    def test_later_batch_gets_the_sales_left_after_earlier_batch(self):
+        # 2 units a day, all picked from the first batch (FEFO)
+        first = self._batch("Paracetamol", "P1", 50, 30)
+        self._batch("paracetamol", "P2", 100, 60)
+        MedicineDailySales.objects.create(medicine_id=first.id, sales_date=self.today, quantity=180, revenue=900)
+
+        # P1 sells out (60 demanded by day 30); P2 gets 120 - 50 = 70 of its 100
+        self.assertEqual(self._risk(), {"P2": (70, 30)})
+
+    def test_stock_expiring_in_earlier_batch_does_not_use_up_later_demand(self):
+        first = self._batch("Cetirizine", "C1", 50, 30)
+        self._batch("Cetirizine", "C2", 100, 60)
+        MedicineDailySales.objects.create(medicine_id=first.id, sales_date=self.today, quantity=90, revenue=450)
+
+        # 1 a day: C1 sells 30 and 20 expire; C2 sells the other 30 demanded by day 60
+        self.assertEqual(self._risk(), {"C1": (30, 20), "C2": (30, 70)})
+
+
+class MedicineDailySalesTests(TestCase):
+
+    def test_removed_line_leaves_no_zero_row(self):
+        today = datetime.date.today()
+        record_medicine_sales(today, after={1: (3, Decimal("30.00")), 2: (1, Decimal("12.00"))})
+        record_medicine_sales(
+            today,
+            before={1: (3, Decimal("30.00")), 2: (1, Decimal("12.00"))},
+            after={1: (5, Decimal("50.00"))},
+        )
+
+        self.assertEqual(
+            list(MedicineDailySales.objects.values_list("medicine_id", "quantity", "revenue")),
+            [(1, 5, Decimal("50.00"))],
+        )
+
+    def test_top_medicines_adds_up_batches_of_a_medicine(self):
+        today = datetime.date.today()
+        first, second, other = (
+            MedicineInventory.objects.create(name=name, batch_number=batch_number, mrp=10, current_stock=10)
+            for name, batch_number in (("Paracetamol", "P1"), ("paracetamol", "P2"), ("Cetirizine", "C1"))
+        )
+        record_medicine_sales(today, after={
+            first.id: (3, Decimal("30.00")), second.id: (2, Decimal("20.00")), other.id: (4, Decimal("40.00")),
+        })
+
+        self.assertEqual(
+            [(row["name"], row["medicine_ids"], row["total_quantity"]) for row in top_medicines(today, today)],
+            [("Paracetamol", [first.id, second.id], 5), ("Cetirizine", [other.id], 4)],
+        )
+        self.assertEqual(
+            [row["batch_number"] for row in top_medicines(today, today, group_by="batch")],
+            ["C1", "P1", "P2"],
+        )
+
+
+class InvoicePdfCacheTests(TestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache_settings = override_settings(INVOICE_PDF_CACHE_DIR=cache_dir.name)
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        self.cache_dir = cache_dir.name
+
+        self.medicine = MedicineInventory.objects.create(name="Paracetamol", batch_number="P1", mrp=10, current_stock=10)
+        for invoice_db_id in (5, 15):
+            SalesInvoiceItem.objects.create(
+                sales_invoice_id=invoice_db_id, medicine_id=self.medicine.id, quantity=1,
+                mrp=10, discount=0, discount_price=0, selling_price=10, sales_date=datetime.date.today(),
+            )
+        for name in ("5_0123456789abcdef.pdf", "15_0123456789abcdef.pdf", "1_0123456789abcdef.pdf"):
+            open(os.path.join(self.cache_dir, name), "wb").close()
+
+    def _patch(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().patch("/apis/medicines", {"id": self.medicine.id, **fields}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return sorted(os.listdir(self.cache_dir))
+
+    def test_renaming_a_medicine_drops_pdfs_of_its_invoices(self):
+        self.assertEqual(self._patch(name="Paracetamol 500"), ["1_0123456789abcdef.pdf"])
+
+    def test_other_medicine_edits_keep_cached_pdfs(self):
+        self.assertEqual(len(self._patch(rack_location="R2", current_stock=20)), 3)
+
+
+class SalesInvoicePatchTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.a, self.b, self.c = (
+            MedicineInventory.objects.create(name=name, batch_number=name, mrp=mrp, current_stock=stock)
+            for name, mrp, stock in (("A", 10, 10), ("B", 20, 10), ("C", 5, 5))
+        )
+        response = self.client.post("/apis/salesInvoices", {"payment_mode": "Cash", "items": [
+            {"medicine_id": self.a.id, "quantity": 2, "discount": 0},
+            {"medicine_id": self.b.id, "quantity": 3, "discount": 0},
+        ]}, format="json")
+        self.invoice = SalesInvoice.objects.get(id=response.json()["data"]["id"])
+        self.a_line = SalesInvoiceItem.objects.get(sales_invoice_id=self.invoice.id, medicine_id=self.a.id)
+
+    def _patch(self, *items):
+        return self.client.patch("/apis/salesInvoices", {"id": self.invoice.id, "items": list(items)}, format="json")
+
+    def _state(self):
+        return {
+            "lines": sorted(SalesInvoiceItem.objects.filter(
+                sales_invoice_id=self.invoice.id).values_list("id", "medicine_id", "quantity")),
+            "stock": dict(MedicineInventory.objects.values_list("name", "current_stock")),
+            "movements": sorted(StockMovement.objects.values_list("medicine_id", "quantity", "reason")),
+            "invoice": SalesInvoice.objects.filter(id=self.invoice.id).values(
+                "total_medicines", "total_price", "final_selling_price").get(),
+            "summary": list(SalesDailySummary.objects.values_list("payment_mode", "invoice_count", "net_amount")),
+            "daily": sorted(MedicineDailySales.objects.values_list("medicine_id", "quantity")),
+        }
+
+    def test_patch_applies_added_changed_and_removed_lines(self):
+        response = self._patch(
+            {"medicine_id": self.a.id, "quantity": 4},
+            {"medicine_id": self.c.id, "quantity": 1},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        state = self._state()
+        lines = {medicine_id: (line_id, quantity) for line_id, medicine_id, quantity in state["lines"]}
+        self.assertEqual(set(lines), {self.a.id, self.c.id})
+        self.assertEqual(lines[self.a.id], (self.a_line.id, 4))     # changed in place
+        self.assertEqual(lines[self.c.id][1], 1)
+        self.assertEqual(state["stock"], {"A": 6, "B": 10, "C": 4})
+        self.assertEqual(
+            [movement for movement in state["movements"] if movement[2] == "sale_edit"],
+            sorted([(self.a.id, -2, "sale_edit"), (self.b.id, 3, "sale_edit"), (self.c.id, -1, "sale_edit")]),
+        )
+        self.assertEqual(state["invoice"], {
+            "total_medicines": 2, "total_price": Decimal("45.00"), "final_selling_price": Decimal("45.00"),
+        })
+        self.assertEqual(state["summary"], [("Cash", 1, Decimal("45.00"))])
+        self.assertEqual(state["daily"], sorted([(self.a.id, 4), (self.c.id, 1)]))
+
+    def test_patch_beyond_stock_is_refused_and_changes_nothing(self):
+        before = self._state()
+
+        response = self._patch(
+            {"medicine_id": self.a.id, "quantity": 13},
+            {"medicine_id": self.c.id, "quantity": 1},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Insufficient stock for A", response.json()["message"])
+        self.assertEqual(self._state(), before)
+
+    def test_diff_leaves_identical_lines_untouched(self):
+        old_items = list(SalesInvoiceItem.objects.filter(sales_invoice_id=self.invoice.id).order_by("id"))
+        diff = diff_sales_items(self.invoice.id, old_items, [
+            {"medicine_id": self.a.id, "quantity": 2, "mrp": "10.00"},
+            {"medicine_id": self.b.id, "quantity": 3, "mrp": "20.00"},
+        ], {})
+
+        self.assertEqual((diff["added"], diff["changed"], diff["removed"]), ([], [], []))
+        self.assertEqual(set(diff["totals"].values()), {0})
+
+
+class SellByNameFefoTests(TestCase):
+
+    def setUp(self):
+        today = datetime.date.today()
+        self.batches = {
+            batch_number: MedicineInventory.objects.create(
+                name=name, batch_number=batch_number, mrp=10, current_stock=stock,
+                expiry_date=today + datetime.timedelta(days=expires_in),
+            )
+            for name, batch_number, stock, expires_in in (
+                ("Paracetamol", "EXPIRED", 50, -1),
+                ("Paracetamol", "LATE-1", 3, 30),
+                ("PARACETAMOL", "LATE-2", 4, 30),
+                ("paracetamol", "EARLY", 2, 10),
+            )
+        }
+
+    def _stock(self):
+        return dict(MedicineInventory.objects.values_list("batch_number", "current_stock"))
+
+    def test_name_lock_matches_batches_case_insensitively(self):
+        locked = lock_medicines([], [" paracetamol "])
+
+        self.assertEqual(
+            {medicine.batch_number for medicine in locked.values()}, {"LATE-1", "LATE-2", "EARLY"}
+        )
+
+    def test_lines_by_name_take_earliest_expiry_first_across_lines(self):
+        response = APIClient().post("/apis/salesInvoices", {"payment_mode": "Cash", "items": [
+            {"medicine_name": "paracetamol", "quantity": 4},
+            {"medicine_name": "Paracetamol", "quantity": 3},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        # EARLY first, then equal expiries in id order; the expired batch is never sold
+        lines = SalesInvoiceItem.objects.filter(sales_invoice_id=response.json()["data"]["id"]).order_by("id")
+        ids = {batch.id: batch_number for batch_number, batch in self.batches.items()}
+        self.assertEqual(
+            [(ids[line.medicine_id], line.quantity) for line in lines],
+            [("EARLY", 2), ("LATE-1", 2), ("LATE-1", 1), ("LATE-2", 2)],
+        )
+        self.assertEqual(self._stock(), {"EXPIRED": 50, "LATE-1": 0, "LATE-2": 2, "EARLY": 0})
+
+    def test_expired_stock_does_not_count_towards_a_sale_by_name(self):
+        response = APIClient().post("/apis/salesInvoices", {"payment_mode": "Cash", "items": [
+            {"medicine_name": "Paracetamol", "quantity": 10},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Available: 9", response.json()["message"])
+        self.assertEqual(self._stock(), {"EXPIRED": 50, "LATE-1": 3, "LATE-2": 4, "EARLY": 2})
+
+
+class InvoiceSequenceTests(TestCase):
+
+    def test_invoices_are_numbered_consecutively_under_the_store_prefix(self):
+        StoreProfile.objects.create(store_name="Store", invoice_prefix="ABC")
+        today = datetime.datetime.now().strftime("%Y%m%d")
+
+        invoice_ids = [SalesInvoice.objects.create(payment_mode="Cash").invoice_id for _ in range(3)]
+
+        self.assertEqual(invoice_ids, [f"ABC-{today}-0000{number}" for number in (1, 2, 3)])
+        self.assertEqual(InvoiceSequence.objects.get(sequence_key=f"ABC-{today}").last_number, 3)
+
+    def test_first_number_taken_concurrently_moves_on_to_the_next(self):
+        # Another request inserted number 1 after our UPDATE found no row
+        InvoiceSequence.objects.create(sequence_key="PMS-20261018", last_number=1)
+        update = QuerySet.update
+        updates = []
+
+        def update_before_the_other_insert(queryset, **fields):
+            updates.append(fields)
+            return 0 if len(updates) == 1 else update(queryset, **fields)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=update_before_the_other_insert):
+            number = InvoiceSequence.next_number("PMS-20261018")
+
+        self.assertEqual((number, len(updates)), (2, 2))
+        self.assertEqual(InvoiceSequence.objects.get(sequence_key="PMS-20261018").last_number, 2)
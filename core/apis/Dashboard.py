@@ -1,43 +1,69 @@
-from django.http import JsonResponse
+import json
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views import View
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from django.db.models import Count, Sum
-from apps.models import (
-    MedicineInventory, Supplier, SalesInvoice,
-    PurchaseInvoice, ExpiryReturn
-)
+from apps.helpers.dashboard_helper import dashboard_stats
+from apps.helpers.dashboard_stream_helper import dashboard_broadcaster
 
 
 class DashboardStatsView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        total_medicines = MedicineInventory.objects.filter(is_active=True).count()
-        total_suppliers = Supplier.objects.filter(is_active=True).count()
-        total_sales_bills = SalesInvoice.objects.count()
-        total_purchase_bills = PurchaseInvoice.objects.count()
+        return JsonResponse({
+            "status": True,
+            "data": dashboard_stats()
+        })
 
-        low_stock_count = MedicineInventory.objects.filter(
-            is_active=True, current_stock__lte=10, current_stock__gt=0
-        ).count()
 
-        out_of_stock_count = MedicineInventory.objects.filter(
-            is_active=True, current_stock__lte=0
-        ).count()
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
 
-        expired_count = MedicineInventory.objects.filter(
-            is_active=True, is_expired=True
-        ).count()
 
-        return JsonResponse({
-            "status": True,
-            "data": {
-                "total_medicines": total_medicines,
-                "total_suppliers": total_suppliers,
-                "total_sales_bills": total_sales_bills,
-                "total_purchase_bills": total_purchase_bills,
-                "low_stock_count": low_stock_count,
-                "out_of_stock_count": out_of_stock_count,
-                "expired_count": expired_count,
-            }
-        })
+class DashboardStreamView(View):
+    """
+    Live dashboard counters as server-sent events (text/event-stream).
+
+        event: snapshot   all counters, once on connect
+        event: delta      {"values": {counter: new value}, "deltas": {counter: change}}
+                          for the counters moved by a committed write
+
+    Each open dashboard is one idle connection on the event loop; nothing
+    is queried per client after the snapshot. Needs an ASGI server
+    (e.g. uvicorn app.asgi:application): under WSGI a worker thread would
+    be held for as long as the page is open, so it answers 503 there and
+    the page keeps the numbers it fetched on load.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"status": False, "message": "Live dashboard needs the ASGI server."}, status=503)
+
+        async def events():
+            queue = dashboard_broadcaster.subscribe()
+            try:
+                stats = await sync_to_async(dashboard_stats)()
+                dashboard_broadcaster.baseline(stats)
+                yield _sse("snapshot", stats)
+
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=settings.DASHBOARD_STREAM_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        # Comment line: keeps proxies from closing an idle stream
+                        yield ": keepalive\n\n"
+                        continue
+                    yield _sse("delta", event)
+            finally:
+                dashboard_broadcaster.unsubscribe(queue)
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -4,15 +4,19 @@ from django.db.models import Q, Sum, Subquery, OuterRef
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework import serializers
-from rest_framework.pagination import PageNumberPagination
+from apps.helpers.pagination_helper import StandardResultsPagination
 from django.db import transaction
 
 from apps.models import (
     ExpiryReturn,
     ExpiryReturnItem,
+    ExpiryRiskForecast,
     Supplier,
     MedicineInventory,
 )
+from apps.helpers.catalog_helper import medicines_changed
+from apps.helpers.stock_ledger_helper import record_stock_movements
+from apps.helpers.expiry_risk_helper import latest_forecast_at
 
 import logging
 logger = logging.getLogger(__name__)
@@ -57,6 +61,7 @@ class ExpiryReturnCRUDView(APIView):
                 )
 
                 total_amount = Decimal("0.00")
+                stock_out = {}
 
                 for idx, item in enumerate(items, start=1):
                     medicine_id = item.get("medicine_id")
@@ -70,8 +75,10 @@ class ExpiryReturnCRUDView(APIView):
                     qty = int(quantity)
 
                     # Stock outward
+                    stock_before = medicine.current_stock
                     medicine.current_stock = max(0, medicine.current_stock - qty)
                     medicine.save(update_fields=["current_stock"])
+                    stock_out[medicine.id] = stock_out.get(medicine.id, 0) + medicine.current_stock - stock_before
 
                     line_total = Decimal(str(rate)) * qty
 
@@ -88,6 +95,9 @@ class ExpiryReturnCRUDView(APIView):
                 expiry_return.total_amount = total_amount
                 expiry_return.save(update_fields=["total_amount"])
 
+                record_stock_movements(stock_out, "expiry_return", expiry_return.id)
+                medicines_changed(item["medicine_id"] for item in items)
+
             return JsonResponse({
                 "status": True,
                 "message": "Expiry return created successfully",
@@ -161,12 +171,6 @@ class ExpiryReturnListSerializer(serializers.ModelSerializer):
         ]
 
 
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
-
 class ExpiryReturnListView(APIView):
     permission_classes = [AllowAny]
 
@@ -220,3 +224,53 @@ class ExpiryReturnListView(APIView):
             "message": "Expiry return list fetched.",
             "data": data
         })
+
+
+class ExpiryRiskListView(APIView):
+    """
+    Batches projected to expire unsold, from the latest forecast snapshot
+    (manage.py forecast_expiry_risk). Soonest expiry first.
+    GET ?supplier_id=&within_days= (both optional), paginated like the other lists.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        forecast_at = latest_forecast_at()
+        queryset = ExpiryRiskForecast.objects.filter(forecast_at=forecast_at).order_by("id")
+
+        try:
+            if request.GET.get("supplier_id"):
+                queryset = queryset.filter(supplier_id=int(request.GET["supplier_id"]))
+            if request.GET.get("within_days"):
+                queryset = queryset.filter(days_to_expiry__lte=int(request.GET["within_days"]))
+        except ValueError:
+            return JsonResponse({"status": False, "message": "supplier_id and within_days must be whole numbers."}, status=400)
+
+        # Rows are written in urgency order, so id order is urgency order
+        paginator = StandardResultsPagination(ordering=("id",))
+        page = paginator.paginate_queryset(queryset, request)
+
+        data = [
+            {
+                "medicine_id": row.medicine_id,
+                "name": row.name,
+                "batch_number": row.batch_number,
+                "expiry_date": row.expiry_date,
+                "days_to_expiry": row.days_to_expiry,
+                "current_stock": row.current_stock,
+                "daily_velocity": str(row.daily_velocity),
+                "projected_sold": row.projected_sold,
+                "quantity_at_risk": row.quantity_at_risk,
+                "value_at_risk": str(row.value_at_risk),
+                "supplier_id": row.supplier_id,
+                "supplier_name": row.supplier_name or "-",
+            }
+            for row in page
+        ]
+
+        return paginator.get_paginated_response({
+            "status": True,
+            "message": "Expiry risk forecast fetched." if forecast_at else "No forecast yet (run manage.py forecast_expiry_risk).",
+            "forecast_at": forecast_at,
+            "data": data
+        })
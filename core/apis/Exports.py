@@ -0,0 +1,44 @@
+import datetime
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny
+from django.http import JsonResponse, StreamingHttpResponse
+from apps.helpers.export_helper import stream_export, CONTENT_TYPES, CSV
+
+
+class DataExportView(APIView):
+    """
+    Streams a whole table as a download, in constant memory.
+    GET ?output=csv|ndjson&from_date=YYYY-MM-DD&to_date=YYYY-MM-DD
+    (output defaults to csv; dates optional, both inclusive)
+
+    One view per dataset, see DATASETS in export_helper:
+    exportMedicines, exportSales, exportSalesItems, exportPurchases, exportPurchaseItems.
+    """
+    permission_classes = [AllowAny]
+    dataset = None
+
+    def get(self, request):
+        # Not ?format=: DRF reserves it for renderer selection
+        output = request.GET.get("output", CSV).lower()
+        if output not in CONTENT_TYPES:
+            return JsonResponse({'status': False, 'message': 'output must be csv or ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            from_date = datetime.date.fromisoformat(request.GET["from_date"]) if request.GET.get("from_date") else None
+            to_date = datetime.date.fromisoformat(request.GET["to_date"]) if request.GET.get("to_date") else None
+        except ValueError:
+            return JsonResponse({'status': False, 'message': 'from_date and to_date must be YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if from_date and to_date and from_date > to_date:
+            return JsonResponse({'status': False, 'message': 'from_date must not be after to_date.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            stream_export(self.dataset, output, from_date, to_date),
+            content_type=CONTENT_TYPES[output]
+        )
+        filename = "_".join(str(part) for part in (self.dataset, from_date, to_date) if part)
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+        # Let nginx pass chunks through as they are produced
+        response['X-Accel-Buffering'] = 'no'
+        return response
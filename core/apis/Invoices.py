@@ -1,68 +1,133 @@
-import os
-import pdfkit
-from django.conf import settings
+import datetime
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from django.http import HttpResponse, JsonResponse
-from django.template.loader import render_to_string
-from apps.models import SalesInvoice, SalesInvoiceItem, StoreProfile, MedicineInventory
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse
+from apps.models import SalesInvoice
+from apps.helpers.invoice_pdf_helper import (
+    RenderQueueFull,
+    get_store_header,
+    invoice_cache_key,
+    cached_invoice_pdf,
+    store_invoice_pdf,
+    render_invoice_html,
+    render_pdf,
+    submit_render_job,
+    get_render_job,
+    stream_invoice_zip,
+)
 
 class InvoiceGenerate(APIView):
     permission_classes = [AllowAny]
 
+    # --------------------------------------------------
+    # RENDER INVOICE PDF (SYNC, OR ASYNC WITH "async": true)
+    # --------------------------------------------------
     def post(self, request):
         invoice_db_id = request.data.get('invoice_id')
-        
+        run_async = str(request.data.get('async', '')).lower() in ('1', 'true', 'yes')
+
         try:
             invoice = SalesInvoice.objects.get(id=invoice_db_id)
-            items = SalesInvoiceItem.objects.filter(sales_invoice_id=invoice.id)
-            store = StoreProfile.objects.first()
-            
-            # Construct Absolute Path for Signature
-            # This points to your project_root/media/signature/sign.jpeg
-            sig_path = os.path.join(settings.MEDIA_ROOT, 'signature', 'sign.jpeg')
-            
-            enriched_items = []
-            for item in items:
-                med = MedicineInventory.objects.filter(id=item.medicine_id).first()
-                enriched_items.append({
-                    'name': med.name if med else "Unknown Medicine",
-                    'batch_number': med.batch_number if med and med.batch_number else "N/A",
-                    'qty': item.quantity,
-                    'mrp': item.mrp,
-                    'discount': item.discount,
-                    'selling_price': item.selling_price
-                })
-
-            context = {
-                'invoice': invoice,
-                'items': enriched_items,
-                'store': store,
-                'logo_url': request.build_absolute_uri(store.logo.url) if store.logo else None,
-                'signature_path': sig_path, # Pass the absolute path here
-            }
+            header = get_store_header()
+            filename = f"Invoice_{invoice.invoice_id}.pdf"
+            cache_key = invoice_cache_key(invoice, header["store"])
 
-            html_content = render_to_string('invoices/invoice_template.html', context)
-
-            options = {
-                'page-size': 'A4',
-                'margin-top': '0.5in',
-                'margin-right': '0.5in',
-                'margin-bottom': '0.5in',
-                'margin-left': '0.5in',
-                'encoding': "UTF-8",
-                'enable-local-file-access': None,
-                'no-outline': None,
-                'disable-smart-shrinking': None, # This prevents "tight" text rendering
-                'dpi': '300', # Higher DPI often clears up letter spacing
-            }
-            
-            config = pdfkit.configuration(wkhtmltopdf=settings.PATH_WKHTMLTOPDF)
-            pdf = pdfkit.from_string(html_content, False, options=options, configuration=config)
+            # Reprint of an unchanged invoice: serve the cached file
+            cached_path = cached_invoice_pdf(cache_key)
 
-            response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="Invoice_{invoice.invoice_id}.pdf"'
-            return response
+            if run_async:
+                job_id = cache_key if cached_path else submit_render_job(
+                    cache_key, render_invoice_html(invoice, header), filename
+                )
+                return JsonResponse({
+                    'status': True,
+                    'message': 'Invoice PDF is ready.' if cached_path else 'Invoice PDF queued for rendering.',
+                    'data': {
+                        'job_id': job_id,
+                        'job_status': 'done' if cached_path else 'pending',
+                        'poll_url': f"{request.path}?job_id={job_id}",
+                        'download_url': f"{request.path}?job_id={job_id}&download=1",
+                    }
+                }, status=200 if cached_path else 202)
+
+            if not cached_path:
+                pdf = render_pdf(render_invoice_html(invoice, header))
+                cached_path = store_invoice_pdf(cache_key, pdf)
+
+            # FileResponse hands the open file to the server's file wrapper (sendfile)
+            return FileResponse(open(cached_path, 'rb'), as_attachment=True,
+                                filename=filename, content_type='application/pdf')
 
+        except SalesInvoice.DoesNotExist:
+            return JsonResponse({'status': False, 'message': 'Sales invoice not found.'}, status=404)
+        except RenderQueueFull as e:
+            response = JsonResponse({'status': False, 'message': str(e)}, status=503)
+            response['Retry-After'] = '5'
+            return response
         except Exception as e:
-            return JsonResponse({'status': False, 'message': str(e)}, status=500)
\ No newline at end of file
+            return JsonResponse({'status': False, 'message': str(e)}, status=500)
+
+    # --------------------------------------------------
+    # POLL / DOWNLOAD AN ASYNC RENDER JOB
+    # --------------------------------------------------
+    def get(self, request):
+        job_id = request.GET.get('job_id')
+        download = request.GET.get('download') in ('1', 'true')
+
+        job = get_render_job(job_id)
+        if not job:
+            return JsonResponse({'status': False, 'message': 'Render job not found.'}, status=404)
+
+        if job['status'] == 'failed':
+            return JsonResponse({'status': False, 'message': job['error'], 'data': {'job_status': 'failed'}}, status=500)
+
+        if job['status'] != 'done':
+            return JsonResponse({
+                'status': True,
+                'message': 'Invoice PDF is being rendered.',
+                'data': {'job_id': job_id, 'job_status': job['status']}
+            }, status=202)
+
+        if download:
+            return FileResponse(open(job['path'], 'rb'), as_attachment=True,
+                                filename=job['filename'], content_type='application/pdf')
+
+        return JsonResponse({
+            'status': True,
+            'message': 'Invoice PDF is ready.',
+            'data': {
+                'job_id': job_id,
+                'job_status': 'done',
+                'download_url': f"{request.path}?job_id={job_id}&download=1",
+            }
+        })
+
+
+class InvoiceExportView(APIView):
+    """
+    Download every sales invoice of a date range as one ZIP of PDFs.
+    GET ?from_date=YYYY-MM-DD&to_date=YYYY-MM-DD (both inclusive)
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        try:
+            from_date = datetime.date.fromisoformat(request.GET.get("from_date", ""))
+            to_date = datetime.date.fromisoformat(request.GET.get("to_date", ""))
+        except ValueError:
+            return JsonResponse({'status': False, 'message': 'from_date and to_date are required (YYYY-MM-DD).'}, status=400)
+
+        if from_date > to_date:
+            return JsonResponse({'status': False, 'message': 'from_date must not be after to_date.'}, status=400)
+
+        invoices = SalesInvoice.objects.filter(
+            invoice_date__gte=from_date,
+            invoice_date__lt=to_date + datetime.timedelta(days=1)
+        ).order_by("invoice_date", "id").iterator(chunk_size=200)
+
+        response = StreamingHttpResponse(
+            stream_invoice_zip(invoices, get_store_header()),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="Invoices_{from_date}_{to_date}.zip"'
+        return response
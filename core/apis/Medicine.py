@@ -1,13 +1,23 @@
-from django.db.models import Q, Subquery, OuterRef, CharField
-from django.db.models.functions import Coalesce
+import io
+import datetime
+from django.db.models import F
 from rest_framework import status
 from django.http import JsonResponse
 from rest_framework import serializers
 from rest_framework.views import APIView
-from apps.models import MedicineInventory, PurchaseInvoiceItem, PurchaseInvoice, Supplier
+from apps.models import MedicineInventory, StockAlert
 from rest_framework.permissions import AllowAny
 from django.db import transaction, IntegrityError
-from rest_framework.pagination import PageNumberPagination
+from apps.helpers.pagination_helper import StandardResultsPagination
+from apps.helpers.medicine_search_helper import search_medicine_ids
+from apps.helpers.medicine_autocomplete_helper import medicine_autocomplete_index
+from apps.helpers.catalog_helper import MEDICINES, medicines_changed, catalog_etag
+from apps.helpers.stock_ledger_helper import record_stock_movements
+from apps.helpers.medicine_import_helper import import_medicines_csv
+from apps.helpers.invoice_pdf_helper import invalidate_medicine_invoice_pdfs
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 
 import logging
 logger = logging.getLogger(__name__)
@@ -40,9 +50,15 @@ class MedicineCRUDView(APIView):
             )
             return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            expiry_date = datetime.date.fromisoformat(str(data.get("expiry_date")))
+        except ValueError:
+            response_data["message"] = "Invalid expiry date, expected YYYY-MM-DD."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
         try:
             with transaction.atomic():
-                MedicineInventory.objects.create(
+                medicine = MedicineInventory.objects.create(
                     name=str(data.get("name")).strip(),
                     medicine_uses=data.get("medicine_uses"),
                     hsn_code=data.get("hsn_code"),
@@ -50,13 +66,17 @@ class MedicineCRUDView(APIView):
                     packing_details=data.get("packing_details"),
                     low_stock_alert=data.get("low_stock_alert", 0),
                     batch_number=data.get("batch_number"),
-                    expiry_date=data.get("expiry_date"),
+                    expiry_date=expiry_date,
                     rack_location=data.get("rack_location"),
+                    purchase_price=data.get("purchase_price") or 0,
                     mrp=data.get("mrp"),
                     current_stock=data.get("current_stock"),
                     is_active=True,
-                    is_expired=False,
+                    # Already past expiry: the sweeper only looks at dates after its last run
+                    is_expired=expiry_date < datetime.date.today(),
                 )
+                record_stock_movements({medicine.id: medicine.current_stock}, "opening")
+                medicines_changed([medicine.id])
 
             response_data["status"] = True
             response_data["message"] = "Medicine created successfully."
@@ -124,33 +144,44 @@ class MedicineCRUDView(APIView):
             return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            medicine = MedicineInventory.objects.get(id=medicine_id)
+            with transaction.atomic():
+                medicine = MedicineInventory.objects.select_for_update().get(id=medicine_id)
+                stock_before = medicine.current_stock
+                name_before = medicine.name
+
+                allowed_fields = [
+                    "name",
+                    "medicine_uses",
+                    "hsn_code",
+                    "unit",
+                    "packing_details",
+                    "low_stock_alert",
+                    "rack_location",
+                    "purchase_price",
+                    "mrp",
+                    "current_stock",
+                    "is_active",
+                    "is_expired",
+                ]
+
+                updated = False
+                for field in allowed_fields:
+                    if field in data:
+                        setattr(medicine, field, data.get(field))
+                        updated = True
+
+                if not updated:
+                    response_data["message"] = "No valid fields provided for update."
+                    return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+                medicine.save()
+                if "current_stock" in data:
+                    record_stock_movements({medicine.id: int(medicine.current_stock) - stock_before}, "adjustment")
+                medicines_changed([medicine.id])
+                if medicine.name != name_before:
+                    # Printed on its sales invoices, which are cached as PDFs
+                    transaction.on_commit(lambda: invalidate_medicine_invoice_pdfs(medicine.id))
 
-            allowed_fields = [
-                "name",
-                "medicine_uses",
-                "hsn_code",
-                "unit",
-                "packing_details",
-                "low_stock_alert",
-                "rack_location",
-                "mrp",
-                "current_stock",
-                "is_active",
-                "is_expired",
-            ]
-
-            updated = False
-            for field in allowed_fields:
-                if field in data:
-                    setattr(medicine, field, data.get(field))
-                    updated = True
-
-            if not updated:
-                response_data["message"] = "No valid fields provided for update."
-                return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
-
-            medicine.save()
             response_data["status"] = True
             response_data["message"] = "Medicine updated successfully."
             return JsonResponse(response_data, status=status.HTTP_200_OK)
@@ -184,12 +215,6 @@ class MedicineInventoryListSerializer(serializers.ModelSerializer):
         ]
 
 
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
-
 class MedicineInventoryListView(APIView):
     """
     List Medicine Inventory with Pagination & Search
@@ -198,18 +223,17 @@ class MedicineInventoryListView(APIView):
     def get(self, request):
         search = request.GET.get("search", "").strip()
 
-        queryset = MedicineInventory.objects.all().order_by("-id")
+        paginator = StandardResultsPagination()
 
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(medicine_uses__icontains=search) |
-                Q(rack_location__icontains=search) |
-                Q(batch_number__icontains=search)
-            )
-
-        paginator = StandardResultsPagination()
-        paginated_qs = paginator.paginate_queryset(queryset, request)
+            # Relevance-ranked ids from the search index, then one query for the page
+            ranked_ids = search_medicine_ids(search)
+            page_ids = paginator.paginate_queryset(ranked_ids, request)
+            medicines = MedicineInventory.objects.in_bulk(page_ids)
+            paginated_qs = [medicines[medicine_id] for medicine_id in page_ids if medicine_id in medicines]
+        else:
+            queryset = MedicineInventory.objects.all().order_by("-id")
+            paginated_qs = paginator.paginate_queryset(queryset, request)
 
         serializer = MedicineInventoryListSerializer(paginated_qs, many=True)
 
@@ -222,27 +246,14 @@ class MedicineInventoryListView(APIView):
 class GetMedicineInventoryListSmall(APIView):
     permission_classes = [AllowAny]
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(etag(catalog_etag(MEDICINES)))
     def get(self, request):
-        # Subquery: get supplier company_name from the latest purchase invoice for each medicine
-        latest_pi = PurchaseInvoiceItem.objects.filter(
-            medicine_id=OuterRef("id")
-        ).order_by("-id").values("purchase_invoice_id")[:1]
-
-        supplier_name_sq = PurchaseInvoice.objects.filter(
-            id=Subquery(latest_pi)
-        ).values("supplier_id")[:1]
-
-        supplier_company = Supplier.objects.filter(
-            id=Subquery(supplier_name_sq)
-        ).values("company_name")[:1]
-
+        # One scan of idx_med_inv_active_name; supplier is the denormalized last_supplier_name
         medicines = MedicineInventory.objects.filter(
             is_active=True
         ).annotate(
-            supplier_name=Coalesce(
-                Subquery(supplier_company, output_field=CharField()),
-                None
-            )
+            supplier_name=F("last_supplier_name")
         ).values(
             "id",
             "name",
@@ -256,4 +267,109 @@ class GetMedicineInventoryListSmall(APIView):
             "status": True,
             "message": "Medicine list fetched successfully.",
             "data": list(medicines)
-        })
\ No newline at end of file
+        })
+
+
+class MedicineAutocompleteView(APIView):
+    """
+    Type-ahead for the POS medicine picker.
+    GET ?q=<prefix>&limit=<k> (default 10, max 50)
+    Matches the start of the name, of any word in the name, or of the batch number.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        prefix = request.GET.get("q", "").strip()
+
+        try:
+            limit = min(max(int(request.GET.get("limit", 10)), 1), 50)
+        except ValueError:
+            limit = 10
+
+        return JsonResponse({
+            "status": True,
+            "message": "Medicine suggestions fetched successfully.",
+            "data": medicine_autocomplete_index.suggest(prefix, limit)
+        })
+
+
+class StockAlertListView(APIView):
+    """
+    Medicines below their own low_stock_alert, or out of stock.
+    GET ?level=low|out (optional), paginated like the other lists.
+    Reads the maintained stock_alerts set, then the page's rows by primary key.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        level = request.GET.get("level", "").strip()
+
+        queryset = StockAlert.objects.all().order_by("-id")
+        if level:
+            queryset = queryset.filter(alert_level=level)
+
+        paginator = StandardResultsPagination()
+        alerts = paginator.paginate_queryset(queryset, request)
+
+        medicines = MedicineInventory.objects.in_bulk([alert.medicine_id for alert in alerts])
+        data = []
+        for alert in alerts:
+            medicine = medicines.get(alert.medicine_id)
+            if not medicine:
+                continue
+            data.append({
+                "id": medicine.id,
+                "name": medicine.name,
+                "batch_number": medicine.batch_number,
+                "rack_location": medicine.rack_location,
+                "current_stock": medicine.current_stock,
+                "low_stock_alert": medicine.low_stock_alert,
+                "supplier_name": medicine.last_supplier_name,
+                "alert_level": alert.alert_level,
+                "alert_since": alert.updated_at,
+            })
+
+        return paginator.get_paginated_response({
+            "status": True,
+            "message": "Stock alerts fetched successfully.",
+            "data": data
+        })
+
+
+class MedicineImportView(APIView):
+    """
+    Bulk catalog import. POST multipart/form-data with a "file" CSV
+    (header row; name, batch_number and mrp columns required).
+    Upserts on (name, batch_number) and returns a per-row error report.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        response_data = {"status": False, "message": "", "data": None, "error": None}
+
+        upload = request.FILES.get("file")
+        if not upload:
+            response_data["message"] = "CSV file is required."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Decode the uploaded file as a stream instead of reading it whole
+            text_stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            report = import_medicines_csv(text_stream)
+
+        except (ValueError, UnicodeDecodeError) as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            logger.exception("Medicine Import Failed")
+            response_data["message"] = "Failed to import medicines."
+            response_data["error"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response_data["status"] = True
+        response_data["message"] = (
+            f"Imported {report['created'] + report['updated']} of {report['total_rows']} rows."
+        )
+        response_data["data"] = report
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
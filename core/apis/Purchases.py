@@ -4,7 +4,7 @@ from django.http import JsonResponse
 from rest_framework import serializers
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from rest_framework.pagination import PageNumberPagination
+from apps.helpers.pagination_helper import StandardResultsPagination
 from django.db.models import Q, Count, OuterRef, Subquery
 
 from apps.models import (
@@ -13,6 +13,10 @@ from apps.models import (
     PurchaseInvoiceItem,
     MedicineInventory,
 )
+from apps.helpers.catalog_helper import medicines_changed
+from apps.helpers.purchase_helper import set_last_supplier, recompute_last_supplier
+from apps.helpers.stock_ledger_helper import record_stock_movements
+from apps.helpers.reorder_helper import reorder_suggestions
 
 import logging
 logger = logging.getLogger(__name__)
@@ -67,6 +71,7 @@ class PurchaseInvoiceCRUDView(APIView):
                 )
 
                 total_amount = 0
+                stock_in = {}
 
                 # -------------------------
                 # Items + Stock Inward
@@ -75,6 +80,7 @@ class PurchaseInvoiceCRUDView(APIView):
                     medicine_id = item.get("medicine_id")
                     quantity = item.get("quantity")
                     mrp = item.get("mrp")
+                    purchase_price = item.get("purchase_price") or None
 
                     if not medicine_id or not quantity:
                         raise ValueError(f"Invalid item at position {index}")
@@ -85,6 +91,7 @@ class PurchaseInvoiceCRUDView(APIView):
                         purchase_invoice_id=invoice.id,
                         medicine_id=medicine_id,
                         quantity=quantity,
+                        purchase_price=purchase_price,
                         mrp=mrp,
                     )
 
@@ -92,7 +99,11 @@ class PurchaseInvoiceCRUDView(APIView):
                     medicine.current_stock += int(quantity)
                     if mrp is not None:
                         medicine.mrp = mrp
-                    medicine.save(update_fields=["current_stock", "mrp"])
+                    # Cost of this batch from now on (sales lines snapshot it)
+                    if purchase_price is not None:
+                        medicine.purchase_price = purchase_price
+                    medicine.save(update_fields=["current_stock", "mrp", "purchase_price"])
+                    stock_in[medicine.id] = stock_in.get(medicine.id, 0) + int(quantity)
 
                     if mrp:
                         total_amount += int(quantity) * float(mrp)
@@ -100,6 +111,13 @@ class PurchaseInvoiceCRUDView(APIView):
                 invoice.total_amount = total_amount
                 invoice.save(update_fields=["total_amount"])
 
+                record_stock_movements(stock_in, "purchase", invoice.id)
+
+                # This invoice is now the latest purchase of every item
+                set_last_supplier([item["medicine_id"] for item in items], supplier_id)
+
+                medicines_changed(item["medicine_id"] for item in items)
+
             response_data["status"] = True
             response_data["message"] = "Purchase invoice created successfully."
             response_data["data"] = {
@@ -159,6 +177,7 @@ class PurchaseInvoiceCRUDView(APIView):
                     {
                         "medicine_id": item.medicine_id,
                         "quantity": item.quantity,
+                        "purchase_price": item.purchase_price,
                         "mrp": item.mrp,
                     }
                     for item in items
@@ -242,6 +261,9 @@ class PurchaseInvoiceCRUDView(APIView):
                     for item in new_items
                 }
 
+                # Net stock change per medicine, for the ledger
+                stock_deltas = {}
+
                 # -------------------------
                 # Reverse OLD stock
                 # -------------------------
@@ -251,6 +273,7 @@ class PurchaseInvoiceCRUDView(APIView):
                     )
                     medicine.current_stock -= old_item.quantity
                     medicine.save(update_fields=["current_stock"])
+                    stock_deltas[medicine.id] = stock_deltas.get(medicine.id, 0) - old_item.quantity
 
                 # -------------------------
                 # Delete old items
@@ -266,6 +289,7 @@ class PurchaseInvoiceCRUDView(APIView):
                     medicine_id = item.get("medicine_id")
                     quantity = item.get("quantity")
                     mrp = item.get("mrp")
+                    purchase_price = item.get("purchase_price") or None
 
                     if not medicine_id or not quantity:
                         raise ValueError(f"Invalid item at position {index}")
@@ -278,6 +302,7 @@ class PurchaseInvoiceCRUDView(APIView):
                         purchase_invoice_id=invoice.id,
                         medicine_id=medicine_id,
                         quantity=quantity,
+                        purchase_price=purchase_price,
                         mrp=mrp,
                     )
 
@@ -285,7 +310,11 @@ class PurchaseInvoiceCRUDView(APIView):
                     medicine.current_stock += int(quantity)
                     if mrp is not None:
                         medicine.mrp = mrp
-                    medicine.save(update_fields=["current_stock", "mrp"])
+                    # Cost of this batch from now on (sales lines snapshot it)
+                    if purchase_price is not None:
+                        medicine.purchase_price = purchase_price
+                    medicine.save(update_fields=["current_stock", "mrp", "purchase_price"])
+                    stock_deltas[medicine.id] = stock_deltas.get(medicine.id, 0) + int(quantity)
 
                     if mrp:
                         total_amount += int(quantity) * float(mrp)
@@ -293,6 +322,14 @@ class PurchaseInvoiceCRUDView(APIView):
                 invoice.total_amount = total_amount
                 invoice.save(update_fields=["total_amount"])
 
+                record_stock_movements(stock_deltas, "purchase_edit", invoice.id)
+
+                # Re-created items are the latest purchase; dropped ones fall back to their previous invoice
+                set_last_supplier(new_item_map, invoice.supplier_id)
+                recompute_last_supplier(set(old_item_map) - set(new_item_map))
+
+                medicines_changed([*old_item_map, *new_item_map])
+
             response_data["status"] = True
             response_data["message"] = "Purchase invoice updated successfully."
             return JsonResponse(response_data, status=status.HTTP_200_OK)
@@ -332,11 +369,6 @@ class PurchaseInvoiceListSerializer(serializers.ModelSerializer):
         ]
 
 
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
 class PurchaseInvoiceListView(APIView):
     """
     List Purchase Invoices with Pagination & Search
@@ -379,3 +411,35 @@ class PurchaseInvoiceListView(APIView):
             "message": "Purchase invoice list fetched successfully.",
             "data": serializer.data
         })
+
+
+class ReorderSuggestionView(APIView):
+    """
+    Draft purchase lists per supplier from sales velocity and stock cover.
+    GET ?supplier_id=&velocity_days=30&lead_time_days=7&cover_days=30 (all optional)
+    Each supplier's "draft" posts to purchaseInvoices once invoice_number
+    and invoice_date are filled in.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response_data = {"status": False, "message": "", "data": None}
+
+        try:
+            params = {
+                name: int(request.GET[name])
+                for name in ("supplier_id", "velocity_days", "lead_time_days", "cover_days")
+                if request.GET.get(name)
+            }
+        except ValueError:
+            response_data["message"] = "supplier_id, velocity_days, lead_time_days and cover_days must be whole numbers."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        if params.get("velocity_days", 1) < 1 or any(params.get(name, 0) < 0 for name in ("lead_time_days", "cover_days")):
+            response_data["message"] = "velocity_days must be at least 1; lead_time_days and cover_days must not be negative."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data["status"] = True
+        response_data["message"] = "Reorder suggestions fetched successfully."
+        response_data["data"] = reorder_suggestions(**params)
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
@@ -0,0 +1,153 @@
+import datetime
+from rest_framework import status
+from django.http import JsonResponse
+from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny
+from apps.helpers.sales_summary_helper import sales_summary
+from apps.helpers.medicine_sales_helper import MEDICINE_SALES_GROUPS, top_medicines, medicine_velocity
+from apps.helpers.pagination_helper import StandardResultsPagination
+from apps.helpers.margin_helper import MARGIN_GROUPS, gross_margin_queryset, gross_margin_totals, gross_margin_rows
+
+MAX_TOP_MEDICINES = 500
+MAX_VELOCITY_MEDICINES = 50
+
+
+def parse_date_range(request):
+    """(from_date, to_date) from ?from_date=&to_date= (both required, inclusive). Raises ValueError."""
+    try:
+        from_date = datetime.date.fromisoformat(request.GET.get("from_date", ""))
+        to_date = datetime.date.fromisoformat(request.GET.get("to_date", ""))
+    except ValueError:
+        raise ValueError("from_date and to_date are required (YYYY-MM-DD).")
+    if from_date > to_date:
+        raise ValueError("from_date must not be after to_date.")
+    return from_date, to_date
+
+
+class SalesSummaryView(APIView):
+    """
+    Revenue per day and per payment mode, from the sales_daily_summary rollup.
+    GET ?from_date=YYYY-MM-DD&to_date=YYYY-MM-DD (both inclusive)
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response_data = {"status": False, "message": "", "data": None}
+
+        try:
+            from_date, to_date = parse_date_range(request)
+        except ValueError as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data["status"] = True
+        response_data["message"] = "Sales summary fetched successfully."
+        response_data["data"] = sales_summary(from_date, to_date)
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
+
+
+class TopMedicinesView(APIView):
+    """
+    Best selling medicines (all batches) or batches of a date range, from medicine_daily_sales.
+    GET ?from_date=YYYY-MM-DD&to_date=YYYY-MM-DD&by=quantity|revenue&limit=50&group_by=name|batch
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response_data = {"status": False, "message": "", "data": None}
+
+        try:
+            from_date, to_date = parse_date_range(request)
+            limit = int(request.GET.get("limit", 50))
+        except ValueError as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        by = request.GET.get("by", "quantity")
+        if by not in ("quantity", "revenue"):
+            response_data["message"] = "by must be quantity or revenue."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.GET.get("group_by", "name")
+        if group_by not in MEDICINE_SALES_GROUPS:
+            response_data["message"] = "group_by must be name or batch."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data["status"] = True
+        response_data["message"] = "Top medicines fetched successfully."
+        response_data["data"] = top_medicines(from_date, to_date, by, max(1, min(limit, MAX_TOP_MEDICINES)), group_by)
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
+
+
+class MedicineVelocityView(APIView):
+    """
+    Units sold per day for some medicines (all batches of each) or batches over a date range.
+    GET ?medicine_ids=1,2,3&from_date=YYYY-MM-DD&to_date=YYYY-MM-DD&group_by=name|batch
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response_data = {"status": False, "message": "", "data": None}
+
+        try:
+            from_date, to_date = parse_date_range(request)
+        except ValueError as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            medicine_ids = list(dict.fromkeys(
+                int(medicine_id) for medicine_id in request.GET.get("medicine_ids", "").split(",")
+            ))
+        except ValueError:
+            response_data["message"] = "medicine_ids must be comma separated ids."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(medicine_ids) > MAX_VELOCITY_MEDICINES:
+            response_data["message"] = f"At most {MAX_VELOCITY_MEDICINES} medicine_ids per request."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.GET.get("group_by", "name")
+        if group_by not in MEDICINE_SALES_GROUPS:
+            response_data["message"] = "group_by must be name or batch."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data["status"] = True
+        response_data["message"] = "Medicine velocity fetched successfully."
+        response_data["data"] = medicine_velocity(medicine_ids, from_date, to_date, group_by)
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
+
+
+class GrossMarginView(APIView):
+    """
+    Revenue, cost of goods and gross margin per invoice, day or medicine,
+    from the unit cost captured on each sales line.
+    GET ?from_date=YYYY-MM-DD&to_date=YYYY-MM-DD&group_by=invoice|day|medicine,
+    paginated like the other lists; "totals" covers the whole range.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response_data = {"status": False, "message": "", "data": None}
+
+        try:
+            from_date, to_date = parse_date_range(request)
+        except ValueError as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.GET.get("group_by", "day")
+        if group_by not in MARGIN_GROUPS:
+            response_data["message"] = "group_by must be invoice, day or medicine."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = StandardResultsPagination(ordering=(MARGIN_GROUPS[group_by],))
+        page = paginator.paginate_queryset(gross_margin_queryset(from_date, to_date, group_by), request)
+
+        return paginator.get_paginated_response({
+            "status": True,
+            "message": "Gross margin fetched successfully.",
+            "group_by": group_by,
+            "totals": gross_margin_totals(from_date, to_date),
+            "data": gross_margin_rows(page, group_by),
+        })
@@ -8,8 +8,13 @@ from rest_framework.views import APIView
 from django.core.paginator import Paginator
 from rest_framework.permissions import AllowAny
 from django.db.models import Q, Count, OuterRef, Subquery
-from rest_framework.pagination import PageNumberPagination
+from apps.helpers.pagination_helper import StandardResultsPagination
 from apps.models import MedicineInventory, SalesInvoice, SalesInvoiceItem
+from apps.helpers.stock_helper import lock_medicines, allocate_fefo, apply_stock_deltas
+from apps.helpers.sales_helper import SALES_LINE_FIELDS, net_stock_deltas, diff_sales_items, stamp_sales_lines
+from apps.helpers.invoice_pdf_helper import invalidate_invoice_pdf
+from apps.helpers.sales_summary_helper import invoice_summary_key, record_sales_change
+from apps.helpers.medicine_sales_helper import medicine_line_totals, record_medicine_sales
 
 
 class SalesInvoiceListSerializer(serializers.ModelSerializer):
@@ -29,11 +34,6 @@ class SalesInvoiceListSerializer(serializers.ModelSerializer):
             "updated_at",
         ]
 
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
 class SalesInvoiceListView(APIView):
     """
     List Purchase Invoices with Pagination & Search
@@ -86,79 +86,115 @@ class SalesInvoiceCRUDView(APIView):
             return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
 
         try:
+            # -------------------------
+            # Validate Items
+            # -------------------------
+            requested_lines = []
+            for index, item in enumerate(items, start=1):
+                medicine_id = item.get("medicine_id")
+                medicine_name = str(item.get("medicine_name") or "").strip()
+                quantity = int(item.get("quantity", 0))
+
+                if not (medicine_id or medicine_name) or quantity <= 0:
+                    response_data["message"] = f"Invalid item or quantity at position {index}"
+                    return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+                requested_lines.append((int(medicine_id) if medicine_id else None, medicine_name, quantity, item))
+
             with transaction.atomic():
                 # -------------------------
-                # Create Invoice Header
+                # Lock all rows in one ordered query
+                # (exact batches by id, FEFO candidates by name)
                 # -------------------------
-                invoice = SalesInvoice.objects.create(
-                    customer_name=data.get("customer_name"),
-                    doctor_name=data.get("doctor_name"),
-                    payment_mode=data.get("payment_mode", "Cash")
+                medicines = lock_medicines(
+                    [medicine_id for medicine_id, _, _, _ in requested_lines if medicine_id],
+                    [medicine_name for medicine_id, medicine_name, _, _ in requested_lines if not medicine_id]
                 )
 
-                total_price = 0
-                total_discount_price = 0
-                total_medicines_count = 0
+                # -------------------------
+                # Check stock in memory + resolve batches
+                # -------------------------
+                available = {medicine.id: medicine.current_stock for medicine in medicines.values()}
+                resolved_lines = []
+
+                for medicine_id, medicine_name, quantity, item in requested_lines:
+                    if medicine_id:
+                        medicine = medicines[medicine_id]
+                        if available[medicine_id] < quantity:
+                            raise ValueError(f"Insufficient stock for {medicine.name}. Available: {available[medicine_id]}")
+                        available[medicine_id] -= quantity
+                        resolved_lines.append((medicine_id, quantity, item))
+                    else:
+                        # Sell by name: one line per batch, earliest expiry first.
+                        # Each batch keeps its own MRP.
+                        batch_item = {key: value for key, value in item.items() if key != "mrp"}
+                        for batch_id, batch_quantity in allocate_fefo(medicine_name, quantity, medicines, available):
+                            resolved_lines.append((batch_id, batch_quantity, batch_item))
+
+                stock_out = {
+                    medicine_id: medicines[medicine_id].current_stock - stock_left
+                    for medicine_id, stock_left in available.items()
+                }
 
                 # -------------------------
-                # Items + Stock Outward
+                # Price Items
                 # -------------------------
-                for index, item in enumerate(items, start=1):
-                    medicine_id = item.get("medicine_id")
-                    quantity = int(item.get("quantity", 0))
-                    
-                    if not medicine_id or quantity <= 0:
-                        response_data["message"] = f"Invalid item or quantity at position {index}"
-                        return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    # Lock the row for update to prevent race conditions
-                    medicine = MedicineInventory.objects.select_for_update().get(id=medicine_id)
-
-                    # 1. Check if stock is available
-                    if medicine.current_stock < quantity:
-                        response_data["message"] = f"Insufficient stock for {medicine.name}. Available: {medicine.current_stock}"
-                        return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
-
-                    # 2. Calculate Pricing for Item
-                    mrp = float(item.get("mrp", medicine.mrp))
+                sales_items = []
+                total_price = 0
+                total_discount_price = 0
+
+                for medicine_id, quantity, item in resolved_lines:
+                    mrp = float(item.get("mrp", medicines[medicine_id].mrp))
                     item_discount_percent = int(item.get("discount", 0))
-                    
+
                     # Logic: discount_price = (mrp * qty) * (percent / 100)
                     item_total_mrp = mrp * quantity
                     item_discount_amt = item_total_mrp * (item_discount_percent / 100)
                     item_selling_price = item_total_mrp - item_discount_amt
 
-                    # 3. Create Sales Item
-                    SalesInvoiceItem.objects.create(
-                        sales_invoice_id=invoice.id,
+                    sales_items.append(SalesInvoiceItem(
                         medicine_id=medicine_id,
                         quantity=quantity,
                         mrp=mrp,
                         discount=item_discount_percent,
                         discount_price=item_discount_amt,
                         selling_price=item_selling_price
-                    )
+                    ))
 
-                    # 4. Update Stock (REDUCE)
-                    medicine.current_stock -= quantity
-                    medicine.save(update_fields=["current_stock"])
-
-                    # 5. Accumulate Totals
                     total_price += item_total_mrp
                     total_discount_price += item_discount_amt
-                    total_medicines_count += 1
 
                 # -------------------------
-                # Finalize Invoice Totals
+                # Create Invoice Header (with final totals)
                 # -------------------------
-                invoice.total_medicines = total_medicines_count
-                invoice.total_price = total_price
-                invoice.total_discount_price = total_discount_price
-                invoice.final_selling_price = total_price - total_discount_price
-                invoice.save()
+                invoice = SalesInvoice.objects.create(
+                    customer_name=data.get("customer_name"),
+                    doctor_name=data.get("doctor_name"),
+                    payment_mode=data.get("payment_mode", "Cash"),
+                    total_medicines=len(sales_items),
+                    total_price=total_price,
+                    total_discount_price=total_discount_price,
+                    final_selling_price=total_price - total_discount_price
+                )
+
+                # -------------------------
+                # Items + Stock Outward (set-based)
+                # -------------------------
+                for sales_item in sales_items:
+                    sales_item.sales_invoice_id = invoice.id
+                stamp_sales_lines(sales_items, invoice.invoice_date, medicines)
+                SalesInvoiceItem.objects.bulk_create(sales_items)
+
+                apply_stock_deltas({
+                    medicine_id: -quantity for medicine_id, quantity in stock_out.items()
+                }, "sale", invoice.id)
+
+                record_medicine_sales(invoice.invoice_date, after=medicine_line_totals(sales_items))
+                record_sales_change(after=invoice_summary_key(invoice))
 
             response_data["status"] = True
             response_data["message"] = "Sales invoice created successfully."
+            response_data["data"] = {"id": invoice.id, "invoice_id": invoice.invoice_id}
             return JsonResponse(response_data, status=status.HTTP_201_CREATED)
 
         except MedicineInventory.DoesNotExist:
@@ -186,6 +222,9 @@ class SalesInvoiceCRUDView(APIView):
         try:
             invoice = SalesInvoice.objects.get(id=invoice_id)
             items = SalesInvoiceItem.objects.filter(sales_invoice_id=invoice.id)
+            medicine_names = dict(
+                MedicineInventory.objects.filter(id__in=[item.medicine_id for item in items]).values_list("id", "name")
+            )
 
             response_data["status"] = True
             response_data["data"] = {
@@ -201,6 +240,7 @@ class SalesInvoiceCRUDView(APIView):
                 "items": [
                     {
                         "medicine_id": item.medicine_id,
+                        "medicine_name": medicine_names.get(item.medicine_id, ""),
                         "quantity": item.quantity,
                         "mrp": item.mrp,
                         "discount": item.discount,
@@ -228,8 +268,14 @@ class SalesInvoiceCRUDView(APIView):
             return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
 
         try:
+            if new_items:
+                for index, item in enumerate(new_items, start=1):
+                    if not item.get("medicine_id") or int(item.get("quantity", 0)) <= 0:
+                        raise ValueError(f"Invalid item or quantity at position {index}")
+
             with transaction.atomic():
                 invoice = SalesInvoice.objects.select_for_update().get(id=invoice_id)
+                summary_before = invoice_summary_key(invoice)
 
                 # -----------------------------
                 # Update invoice header
@@ -237,72 +283,82 @@ class SalesInvoiceCRUDView(APIView):
                 invoice.customer_name = data.get("customer_name", invoice.customer_name)
                 invoice.doctor_name = data.get("doctor_name", invoice.doctor_name)
                 invoice.payment_mode = data.get("payment_mode", invoice.payment_mode)
-                invoice.save()
 
                 if new_items:
+                    old_items = list(
+                        SalesInvoiceItem.objects.filter(sales_invoice_id=invoice.id).order_by("id")
+                    )
+
                     # -----------------------------
-                    # 1. Reverse old stock
+                    # 1. Net stock delta per medicine
                     # -----------------------------
-                    old_items = SalesInvoiceItem.objects.filter(sales_invoice_id=invoice.id)
-                    for old_item in old_items:
-                        med = MedicineInventory.objects.select_for_update().get(id=old_item.medicine_id)
-                        med.current_stock += old_item.quantity
-                        med.save()
+                    stock_deltas = net_stock_deltas(old_items, new_items)
+
+                    # Lock only rows whose stock moves (or whose MRP we need)
+                    medicines = lock_medicines(
+                        set(stock_deltas) |
+                        {int(item["medicine_id"]) for item in new_items if item.get("mrp") is None}
+                    )
 
-                    old_items.delete()
+                    for medicine_id, delta in stock_deltas.items():
+                        medicine = medicines[medicine_id]
+                        if medicine.current_stock + delta < 0:
+                            raise ValueError(f"Insufficient stock for {medicine.name}. Available: {medicine.current_stock}")
 
                     # -----------------------------
-                    # 2. Apply updated items
+                    # 2. Touch only added / changed / removed lines
                     # -----------------------------
-                    total_mrp = 0
-                    total_discount = 0
-                    final_selling = 0
-
-                    for item in new_items:
-                        med = MedicineInventory.objects.select_for_update().get(
-                            id=item["medicine_id"]
-                        )
-
-                        qty = int(item["quantity"])
-                        mrp = float(item.get("mrp", med.mrp))
-                        discount = float(item.get("discount", 0))
-                        selling_price = float(item.get("selling_price", mrp * qty))
-
-                        if med.current_stock < qty:
-                            raise ValueError(f"Insufficient stock for {med.name}")
-
-                        line_mrp = mrp * qty
-                        discount_price = line_mrp - selling_price
-
-                        SalesInvoiceItem.objects.create(
-                            sales_invoice_id=invoice.id,
-                            medicine_id=med.id,
-                            quantity=qty,
-                            mrp=mrp,
-                            discount=discount,
-                            discount_price=discount_price,
-                            selling_price=selling_price
+                    # Before the diff: it updates changed lines in place
+                    lines_before = medicine_line_totals(old_items)
+                    diff = diff_sales_items(invoice.id, old_items, new_items, medicines)
+
+                    if diff["removed"]:
+                        SalesInvoiceItem.objects.filter(
+                            id__in=[item.id for item in diff["removed"]]
+                        ).delete()
+                    if diff["changed"]:
+                        SalesInvoiceItem.objects.bulk_update(
+                            diff["changed"], [*SALES_LINE_FIELDS, "updated_at"]
                         )
-
-                        med.current_stock -= qty
-                        med.save()
-
-                        total_mrp += line_mrp
-                        total_discount += discount_price
-                        final_selling += selling_price
+                    if diff["added"]:
+                        # Changed lines keep the cost they were sold at
+                        stamp_sales_lines(diff["added"], invoice.invoice_date, medicines)
+                        SalesInvoiceItem.objects.bulk_create(diff["added"])
+
+                    apply_stock_deltas(stock_deltas, "sale_edit", invoice.id)
+
+                    removed_ids = {item.id for item in diff["removed"]}
+                    record_medicine_sales(
+                        invoice.invoice_date,
+                        lines_before,
+                        medicine_line_totals([item for item in old_items if item.id not in removed_ids] + diff["added"])
+                    )
 
                     # -----------------------------
-                    # 3. Update invoice totals
+                    # 3. Adjust invoice totals by the diff
                     # -----------------------------
-                    invoice.total_price = total_mrp
-                    invoice.total_discount_price = total_discount
-                    invoice.final_selling_price = final_selling
-                    invoice.save()
+                    for field, delta in diff["totals"].items():
+                        setattr(invoice, field, getattr(invoice, field) + delta)
+
+                invoice.save()
+                record_sales_change(summary_before, invoice_summary_key(invoice))
+
+                # Printed copy is stale now
+                transaction.on_commit(lambda: invalidate_invoice_pdf(invoice.id))
 
             response_data["status"] = True
             response_data["message"] = "Sales invoice updated successfully."
             return JsonResponse(response_data, status=status.HTTP_200_OK)
 
+        except SalesInvoice.DoesNotExist:
+            response_data["message"] = "Sales invoice not found."
+            return JsonResponse(response_data, status=status.HTTP_404_NOT_FOUND)
+        except MedicineInventory.DoesNotExist:
+            response_data["message"] = "Invalid medicine ID provided."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             response_data["message"] = str(e)
-            return JsonResponse(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return JsonResponse(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
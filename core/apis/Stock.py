@@ -0,0 +1,89 @@
+import datetime
+from rest_framework import status
+from django.http import JsonResponse
+from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny
+from apps.models import MedicineInventory, StockMovement
+from apps.helpers.pagination_helper import StandardResultsPagination
+from apps.helpers.stock_ledger_helper import stock_as_of
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class StockAsOfView(APIView):
+    """
+    Stock per medicine at a past moment, from the nearest snapshot plus the ledger.
+    GET ?at=YYYY-MM-DDTHH:MM[:SS]&medicine_ids=1,2,3 (medicine_ids optional, default all)
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        response_data = {"status": False, "message": "", "data": None}
+
+        try:
+            at = datetime.datetime.fromisoformat(request.GET.get("at", ""))
+        except ValueError:
+            response_data["message"] = "at is required (YYYY-MM-DDTHH:MM:SS)."
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        medicine_ids = None
+        if request.GET.get("medicine_ids"):
+            try:
+                medicine_ids = [int(medicine_id) for medicine_id in request.GET["medicine_ids"].split(",")]
+            except ValueError:
+                response_data["message"] = "medicine_ids must be comma separated ids."
+                return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = stock_as_of(at, medicine_ids)
+        except ValueError as e:
+            response_data["message"] = str(e)
+            return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        names = dict(MedicineInventory.objects.filter(id__in=result["stock"].keys()).values_list("id", "name"))
+
+        response_data["status"] = True
+        response_data["message"] = "Stock as of the requested time fetched successfully."
+        response_data["data"] = {
+            "at": at,
+            "snapshot_at": result["snapshot_at"],
+            "replayed_movements": result["replayed_movements"],
+            "items": [
+                {"medicine_id": medicine_id, "name": names.get(medicine_id), "stock": stock}
+                for medicine_id, stock in sorted(result["stock"].items())
+            ],
+        }
+        return JsonResponse(response_data, status=status.HTTP_200_OK)
+
+
+class StockMovementListView(APIView):
+    """
+    Ledger entries of one medicine, newest first.
+    GET ?medicine_id=<id>
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        medicine_id = request.GET.get("medicine_id")
+        if not medicine_id:
+            return JsonResponse({"status": False, "message": "medicine_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = StockMovement.objects.filter(medicine_id=medicine_id).order_by("-id")
+
+        paginator = StandardResultsPagination()
+        movements = paginator.paginate_queryset(queryset, request)
+
+        return paginator.get_paginated_response({
+            "status": True,
+            "message": "Stock movements fetched successfully.",
+            "data": [
+                {
+                    "id": movement.id,
+                    "quantity": movement.quantity,
+                    "reason": movement.reason,
+                    "reference_id": movement.reference_id,
+                    "created_at": movement.created_at,
+                } for movement in movements
+            ]
+        })
@@ -4,6 +4,7 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from django.db import transaction, IntegrityError
 from apps.models import StoreProfile
+from apps.helpers.invoice_pdf_helper import store_profile_changed
 
 import logging
 logger = logging.getLogger(__name__)
@@ -52,6 +53,8 @@ class StoreProfileCRUDView(APIView):
                     invoice_footer_note=data.get("invoice_footer_note"),
                     logo=logo
                 )
+                # Invoice header changed: cached PDFs are stale
+                transaction.on_commit(store_profile_changed)
 
             response_data["status"] = True
             response_data["message"] = "Store profile created successfully."
@@ -163,6 +166,8 @@ class StoreProfileCRUDView(APIView):
                 return JsonResponse(response_data, status=status.HTTP_400_BAD_REQUEST)
 
             store.save()
+            # Invoice header changed: cached PDFs are stale
+            store_profile_changed()
 
             response_data["status"] = True
             response_data["message"] = "Store profile updated successfully."
@@ -199,6 +204,7 @@ class StoreProfileCRUDView(APIView):
         try:
             store = StoreProfile.objects.get(id=store_id)
             store.delete()
+            store_profile_changed()
 
             response_data["status"] = True
             response_data["message"] = "Store profile deleted successfully."
@@ -1,12 +1,16 @@
 from django.db.models import Q
-from apps.models import Supplier
+from apps.models import Supplier, MedicineInventory
+from apps.helpers.catalog_helper import SUPPLIERS, suppliers_changed, catalog_etag
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag
 from rest_framework import status
 from django.http import JsonResponse
 from rest_framework import serializers
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from django.db import transaction, IntegrityError
-from rest_framework.pagination import PageNumberPagination
+from apps.helpers.pagination_helper import StandardResultsPagination
 
 import logging
 logger = logging.getLogger(__name__)
@@ -44,6 +48,7 @@ class SupplierCRUDView(APIView):
                     gst_number=data.get("gst_number"),
                     is_active=data.get("is_active", True),
                 )
+                suppliers_changed()
 
             response_data["status"] = True
             response_data["message"] = "Supplier created successfully."
@@ -147,6 +152,12 @@ class SupplierCRUDView(APIView):
 
             supplier.save()
 
+            if "company_name" in data:
+                MedicineInventory.objects.filter(last_supplier_id=supplier.id).update(
+                    last_supplier_name=supplier.company_name
+                )
+            suppliers_changed(renamed="company_name" in data)
+
             response_data["status"] = True
             response_data["message"] = "Supplier updated successfully."
             return JsonResponse(response_data, status=status.HTTP_200_OK)
@@ -184,6 +195,8 @@ class SupplierCRUDView(APIView):
         try:
             supplier = Supplier.objects.get(id=supplier_id)
             supplier.delete()
+            MedicineInventory.objects.filter(last_supplier_id=supplier_id).update(last_supplier_name=None)
+            suppliers_changed(renamed=True)
 
             response_data["status"] = True
             response_data["message"] = "Supplier deleted successfully."
@@ -213,11 +226,6 @@ class SupplierListSerializer(serializers.ModelSerializer):
             "created_at",
         ]
 
-class StandardResultsPagination(PageNumberPagination):
-    page_size = 10
-    page_size_query_param = "page_size"
-    max_page_size = 100
-
 class SupplierListView(APIView):
     """
     List Suppliers with Pagination & Search
@@ -252,6 +260,8 @@ class SupplierListView(APIView):
 class GetSupplierListSmall(APIView):
     permission_classes = [AllowAny]
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(etag(catalog_etag(SUPPLIERS)))
     def get(self, request):
         suppliers = Supplier.objects.values(
             "id",
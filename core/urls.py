@@ -9,8 +9,11 @@ from core.apis.Medicine import *
 from core.apis.Supplier import *
 from core.apis.Purchases import *
 from core.apis.Invoices import *
-from core.apis.Dashboard import DashboardStatsView
-from core.apis.ExpiryReturn import ExpiryReturnCRUDView, ExpiryReturnListView
+from core.apis.Dashboard import DashboardStatsView, DashboardStreamView
+from core.apis.ExpiryReturn import ExpiryReturnCRUDView, ExpiryReturnListView, ExpiryRiskListView
+from core.apis.Stock import StockAsOfView, StockMovementListView
+from core.apis.Exports import DataExportView
+from core.apis.Reports import SalesSummaryView, TopMedicinesView, MedicineVelocityView, GrossMarginView
 
 app_name = "core"
 
@@ -21,6 +24,7 @@ urlpatterns = [
     path('logout', UserLogoutView.as_view(), name='logout'),
 
     path('dashboardStats', DashboardStatsView.as_view(), name='dashboardStats'),
+    path('dashboardStream', DashboardStreamView.as_view(), name='dashboardStream'),
 
     path('getStoreInformation', GETStoreProfileInformation.as_view(), name='getStoreInformation'),
     path('storeInformation', StoreProfileCRUDView.as_view(), name='storeInformation'),
@@ -28,6 +32,11 @@ urlpatterns = [
     path('medicines', MedicineCRUDView.as_view(), name='medicines'),
     path('medicineList', MedicineInventoryListView.as_view(), name='medicineList'),
     path('getMedicines', GetMedicineInventoryListSmall.as_view(), name='getMedicines'),
+    path('importMedicines', MedicineImportView.as_view(), name='importMedicines'),
+    path('medicineAutocomplete', MedicineAutocompleteView.as_view(), name='medicineAutocomplete'),
+    path('stockAlerts', StockAlertListView.as_view(), name='stockAlerts'),
+    path('stockAsOf', StockAsOfView.as_view(), name='stockAsOf'),
+    path('stockMovements', StockMovementListView.as_view(), name='stockMovements'),
 
     path('supplierList', SupplierListView.as_view(), name='supplierList'),
     path('getSuppliers', GetSupplierListSmall.as_view(), name='getSuppliers'),
@@ -35,14 +44,27 @@ urlpatterns = [
 
     path('purchaseInvoices', PurchaseInvoiceCRUDView.as_view(), name='purchaseInvoices'),
     path('purchaseInvoicesList', PurchaseInvoiceListView.as_view(), name='purchaseInvoicesList'),
+    path('reorderSuggestions', ReorderSuggestionView.as_view(), name='reorderSuggestions'),
 
     path("salesInvoices", SalesInvoiceCRUDView.as_view(), name="salesInvoices"),
     path("salesInvoicesList", SalesInvoiceListView.as_view(), name="salesInvoicesList"),
+    path("salesSummary", SalesSummaryView.as_view(), name="salesSummary"),
+    path("topMedicines", TopMedicinesView.as_view(), name="topMedicines"),
+    path("medicineVelocity", MedicineVelocityView.as_view(), name="medicineVelocity"),
+    path("grossMargin", GrossMarginView.as_view(), name="grossMargin"),
 
     path('generateInvoice', InvoiceGenerate.as_view(), name='generateInvoice'),
+    path('exportInvoices', InvoiceExportView.as_view(), name='exportInvoices'),
+
+    path('exportMedicines', DataExportView.as_view(dataset="medicines"), name='exportMedicines'),
+    path('exportSales', DataExportView.as_view(dataset="sales"), name='exportSales'),
+    path('exportSalesItems', DataExportView.as_view(dataset="sales_items"), name='exportSalesItems'),
+    path('exportPurchases', DataExportView.as_view(dataset="purchases"), name='exportPurchases'),
+    path('exportPurchaseItems', DataExportView.as_view(dataset="purchase_items"), name='exportPurchaseItems'),
 
     path('expiryReturns', ExpiryReturnCRUDView.as_view(), name='expiryReturns'),
     path('expiryReturnsList', ExpiryReturnListView.as_view(), name='expiryReturnsList'),
+    path('expiryRisk', ExpiryRiskListView.as_view(), name='expiryRisk'),
 ]
 
 if settings.DEBUG:
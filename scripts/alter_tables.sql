@@ -0,0 +1,182 @@
+-- Changes for databases created from an older scripts/tables.sql.
+-- Run the statements added since your last upgrade, in order.
+
+-- Medicine search (FULLTEXT, relevance ranked)
+ALTER TABLE `medicine_inventory`
+  ADD FULLTEXT KEY `ft_med_inv_search` (`name`, `batch_number`, `rack_location`, `medicine_uses`);
+
+-- Last supplier on medicine_inventory (fill with: python manage.py backfill_last_supplier)
+ALTER TABLE `medicine_inventory`
+  ADD COLUMN `last_supplier_id` BIGINT UNSIGNED NULL AFTER `is_expired`,
+  ADD COLUMN `last_supplier_name` VARCHAR(255) NULL AFTER `last_supplier_id`,
+  ADD KEY `idx_med_inv_active_name` (`is_active`, `name`),
+  ADD KEY `idx_med_inv_last_supplier` (`last_supplier_id`);
+
+-- Catalog versions (ETag of getMedicines / getSuppliers)
+CREATE TABLE `catalog_versions` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `catalog` VARCHAR(32) NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 0,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_catalog_versions_catalog` (`catalog`)
+);
+
+-- Job checkpoints (expiry sweeper high-water mark)
+CREATE TABLE `job_checkpoints` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `job_name` VARCHAR(64) NOT NULL,
+  `checkpoint` VARCHAR(64) NULL,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_job_checkpoints_job_name` (`job_name`)
+);
+
+-- Low-stock tracker (fill with: python manage.py rebuild_stock_alerts)
+CREATE TABLE `stock_alerts` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `alert_level` VARCHAR(8) NOT NULL,
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_stock_alerts_medicine` (`medicine_id`),
+  KEY `idx_stock_alerts_level` (`alert_level`)
+);
+
+-- Stock movement ledger + snapshots (start with: python manage.py snapshot_stock --initial)
+CREATE TABLE `stock_movements` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `quantity` INT NOT NULL,
+  `reason` VARCHAR(16) NOT NULL,
+  `reference_id` BIGINT UNSIGNED NULL,
+
+  `created_at` DATETIME(6) NOT NULL,
+
+  PRIMARY KEY (`id`),
+
+  KEY `idx_stock_mv_med_created` (`medicine_id`, `created_at`),
+  KEY `idx_stock_mv_created` (`created_at`)
+);
+
+CREATE TABLE `stock_snapshots` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `stock` INT NOT NULL,
+  `taken_at` DATETIME(6) NOT NULL,
+
+  PRIMARY KEY (`id`),
+
+  KEY `idx_stock_snap_taken_med` (`taken_at`, `medicine_id`)
+);
+
+-- Catalog import upserts on (name, batch_number). Merge duplicate batches first:
+--   SELECT name, batch_number, COUNT(*) FROM medicine_inventory GROUP BY name, batch_number HAVING COUNT(*) > 1;
+ALTER TABLE `medicine_inventory`
+  DROP KEY `idx_med_inv_name_batch`,
+  ADD UNIQUE KEY `uq_med_inv_name_batch` (`name`, `batch_number`);
+
+-- Fill with: python manage.py rebuild_sales_summary
+CREATE TABLE `sales_daily_summary` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `sales_date` DATE NOT NULL,
+  `payment_mode` VARCHAR(16) NOT NULL,
+  `invoice_count` INT NOT NULL DEFAULT 0,
+  `gross_amount` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `discount_amount` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `net_amount` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_sales_daily_date_mode` (`sales_date`, `payment_mode`)
+);
+
+-- Fill with: python manage.py rebuild_medicine_daily_sales
+CREATE TABLE `medicine_daily_sales` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `sales_date` DATE NOT NULL,
+  `quantity` INT NOT NULL DEFAULT 0,
+  `revenue` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_med_daily_med_date` (`medicine_id`, `sales_date`),
+  KEY `idx_med_daily_date_cover` (`sales_date`, `medicine_id`, `quantity`, `revenue`)
+);
+
+-- Filled by: python manage.py forecast_expiry_risk
+CREATE TABLE `expiry_risk_forecast` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `forecast_at` DATETIME(6) NOT NULL,
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `name` VARCHAR(255) NOT NULL,
+  `batch_number` VARCHAR(128) NOT NULL,
+  `expiry_date` DATE NOT NULL,
+  `days_to_expiry` INT NOT NULL,
+  `current_stock` INT NOT NULL,
+  `daily_velocity` DECIMAL(10,2) NOT NULL,
+  `projected_sold` INT NOT NULL,
+  `quantity_at_risk` INT NOT NULL,
+  `value_at_risk` DECIMAL(14,2) NOT NULL,
+  `supplier_id` BIGINT UNSIGNED NULL,
+  `supplier_name` VARCHAR(255) NULL,
+
+  PRIMARY KEY (`id`),
+
+  KEY `idx_exp_risk_at_supplier` (`forecast_at`, `supplier_id`)
+);
+
+-- Sale-time cost on sales lines (gross margin report). Lines sold before this
+-- change get today's purchase_price of their batch, the closest value left.
+ALTER TABLE `sales_invoice_items`
+  ADD COLUMN `sales_date` DATE NULL AFTER `selling_price`,
+  ADD COLUMN `unit_cost` DECIMAL(10,2) NOT NULL DEFAULT 0.00 AFTER `sales_date`;
+
+UPDATE `sales_invoice_items` sii
+  JOIN `sales_invoices` si ON si.`id` = sii.`sales_invoice_id`
+  SET sii.`sales_date` = DATE(si.`invoice_date`);
+
+UPDATE `sales_invoice_items` sii
+  JOIN `medicine_inventory` mi ON mi.`id` = sii.`medicine_id`
+  SET sii.`unit_cost` = mi.`purchase_price`;
+
+ALTER TABLE `sales_invoice_items`
+  MODIFY `sales_date` DATE NOT NULL,
+  ADD KEY `idx_sii_date_margin` (`sales_date`, `sales_invoice_id`, `medicine_id`, `quantity`, `selling_price`, `unit_cost`);
+
+-- Sales invoice numbering (PREFIX-YYYYMMDD-NNNNN from a per-day counter).
+-- The seed continues each prefix and day after its highest existing number,
+-- so new ids cannot collide with the ones already issued.
+CREATE TABLE `invoice_sequences` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `sequence_key` VARCHAR(64) NOT NULL,
+  `last_number` BIGINT NOT NULL DEFAULT 0,
+
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_invoice_seq_key` (`sequence_key`)
+);
+
+INSERT INTO `invoice_sequences` (`sequence_key`, `last_number`)
+SELECT
+  LEFT(`invoice_id`, CHAR_LENGTH(`invoice_id`) - CHAR_LENGTH(SUBSTRING_INDEX(`invoice_id`, '-', -1)) - 1),
+  MAX(CAST(SUBSTRING_INDEX(`invoice_id`, '-', -1) AS UNSIGNED))
+FROM `sales_invoices`
+WHERE `invoice_id` REGEXP '^.+-[0-9]+$'
+GROUP BY 1
+ON DUPLICATE KEY UPDATE `last_number` = GREATEST(`last_number`, VALUES(`last_number`));
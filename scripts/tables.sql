@@ -64,21 +64,28 @@ CREATE TABLE `medicine_inventory` (
   `is_active` BOOLEAN NOT NULL DEFAULT TRUE,
   `is_expired` BOOLEAN NOT NULL DEFAULT FALSE,
 
+  `last_supplier_id` BIGINT UNSIGNED NULL,
+  `last_supplier_name` VARCHAR(255) NULL,
+
   `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
 
   PRIMARY KEY (`id`),
 
   KEY `idx_med_inv_name` (`name`),
-  KEY `idx_med_inv_name_batch` (`name`, `batch_number`),
+  UNIQUE KEY `uq_med_inv_name_batch` (`name`, `batch_number`),
   KEY `idx_med_inv_expiry` (`expiry_date`),
   KEY `idx_med_inv_stock` (`current_stock`),
   KEY `idx_med_inv_active` (`is_active`),
   KEY `idx_med_inv_active_expiry` (`is_active`, `expiry_date`),
   KEY `idx_med_inv_active_stock` (`is_active`, `current_stock`),
+  KEY `idx_med_inv_active_name` (`is_active`, `name`),
+  KEY `idx_med_inv_last_supplier` (`last_supplier_id`),
   KEY `idx_med_inv_rack` (`rack_location`),
   KEY `idx_med_expiry` (`expiry_date`),
-  KEY `idx_med_created_at` (`created_at`)
+  KEY `idx_med_created_at` (`created_at`),
+
+  FULLTEXT KEY `ft_med_inv_search` (`name`, `batch_number`, `rack_location`, `medicine_uses`)
 );
 
 CREATE TABLE `suppliers` (
@@ -175,6 +182,144 @@ CREATE TABLE `sales_invoices` (
   KEY `idx_si_id_date` (`invoice_id`, `invoice_date`)
 );
 
+CREATE TABLE `invoice_sequences` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `sequence_key` VARCHAR(64) NOT NULL,
+  `last_number` BIGINT NOT NULL DEFAULT 0,
+
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_invoice_seq_key` (`sequence_key`)
+);
+
+CREATE TABLE `catalog_versions` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `catalog` VARCHAR(32) NOT NULL,
+  `version` BIGINT NOT NULL DEFAULT 0,
+
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_catalog_versions_catalog` (`catalog`)
+);
+
+CREATE TABLE `job_checkpoints` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `job_name` VARCHAR(64) NOT NULL,
+  `checkpoint` VARCHAR(64) NULL,
+
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_job_checkpoints_job_name` (`job_name`)
+);
+
+CREATE TABLE `stock_alerts` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `alert_level` VARCHAR(8) NOT NULL,
+
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_stock_alerts_medicine` (`medicine_id`),
+  KEY `idx_stock_alerts_level` (`alert_level`)
+);
+
+CREATE TABLE `stock_movements` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `quantity` INT NOT NULL,
+  `reason` VARCHAR(16) NOT NULL,
+  `reference_id` BIGINT UNSIGNED NULL,
+
+  `created_at` DATETIME(6) NOT NULL,
+
+  PRIMARY KEY (`id`),
+
+  KEY `idx_stock_mv_med_created` (`medicine_id`, `created_at`),
+  KEY `idx_stock_mv_created` (`created_at`)
+);
+
+CREATE TABLE `stock_snapshots` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `stock` INT NOT NULL,
+  `taken_at` DATETIME(6) NOT NULL,
+
+  PRIMARY KEY (`id`),
+
+  KEY `idx_stock_snap_taken_med` (`taken_at`, `medicine_id`)
+);
+
+CREATE TABLE `sales_daily_summary` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `sales_date` DATE NOT NULL,
+  `payment_mode` VARCHAR(16) NOT NULL,
+  `invoice_count` INT NOT NULL DEFAULT 0,
+  `gross_amount` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `discount_amount` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+  `net_amount` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_sales_daily_date_mode` (`sales_date`, `payment_mode`)
+);
+
+CREATE TABLE `medicine_daily_sales` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `sales_date` DATE NOT NULL,
+  `quantity` INT NOT NULL DEFAULT 0,
+  `revenue` DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+
+  UNIQUE KEY `uq_med_daily_med_date` (`medicine_id`, `sales_date`),
+  KEY `idx_med_daily_date_cover` (`sales_date`, `medicine_id`, `quantity`, `revenue`)
+);
+
+CREATE TABLE `expiry_risk_forecast` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+
+  `forecast_at` DATETIME(6) NOT NULL,
+  `medicine_id` BIGINT UNSIGNED NOT NULL,
+  `name` VARCHAR(255) NOT NULL,
+  `batch_number` VARCHAR(128) NOT NULL,
+  `expiry_date` DATE NOT NULL,
+  `days_to_expiry` INT NOT NULL,
+  `current_stock` INT NOT NULL,
+  `daily_velocity` DECIMAL(10,2) NOT NULL,
+  `projected_sold` INT NOT NULL,
+  `quantity_at_risk` INT NOT NULL,
+  `value_at_risk` DECIMAL(14,2) NOT NULL,
+  `supplier_id` BIGINT UNSIGNED NULL,
+  `supplier_name` VARCHAR(255) NULL,
+
+  PRIMARY KEY (`id`),
+
+  KEY `idx_exp_risk_at_supplier` (`forecast_at`, `supplier_id`)
+);
+
 CREATE TABLE `sales_invoice_items` (
   `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
 
@@ -188,13 +333,17 @@ CREATE TABLE `sales_invoice_items` (
   `discount_price` DECIMAL(10,2) NOT NULL,
   `selling_price` DECIMAL(10,2) NOT NULL,
 
+  `sales_date` DATE NOT NULL,
+  `unit_cost` DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+
   `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
 
   PRIMARY KEY (`id`),
 
   KEY `idx_sii_si` (`sales_invoice_id`),
-  KEY `idx_sii_med` (`medicine_id`)
+  KEY `idx_sii_med` (`medicine_id`),
+  KEY `idx_sii_date_margin` (`sales_date`, `sales_invoice_id`, `medicine_id`, `quantity`, `selling_price`, `unit_cost`)
 );
 
 CREATE TABLE `expiry_returns` (